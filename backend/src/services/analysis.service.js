@@ -1,6 +1,7 @@
 const { RSI, MACD, EMA, ATR, BollingerBands, OBV, ADX } = require('technicalindicators');
 const { Indicator } = require('../models');
 const marketService = require('./market.service');
+const mlStream = require('./mlStream.service');
 const logger = require('../utils/logger');
 const { setCache, getCache } = require('../database/config/redis');
 
@@ -94,6 +95,11 @@ class AnalysisService {
         bbWidth,
       });
 
+      // Score the new candle now; signal generation picks the result up from the stream cache
+      mlStream.pushCandle(
+        symbol, timeframe, mlStream.toMlIndicators(indicator, parseFloat(latestCandle.close)), indicator.timestamp
+      );
+
       logger.info(`Calculated indicators for ${symbol} ${timeframe}`);
       return indicator;
     } catch (error) {
@@ -0,0 +1,179 @@
+const WebSocket = require('ws');
+const logger = require('../utils/logger');
+
+// Requests waiting for a reply before new ones are rejected (caller falls back to HTTP)
+const MAX_PENDING = 256;
+// Unsent bytes queued on the socket before new requests are rejected
+const MAX_BUFFERED_BYTES = 1024 * 1024;
+const RECONNECT_MIN_MS = 1000;
+const RECONNECT_MAX_MS = 30000;
+
+/**
+ * Persistent WebSocket channel to the ML service (/ws/predict).
+ * One socket is shared by every caller; requests are pipelined and matched
+ * to replies by id, so there is no per-prediction connection setup.
+ * Indicator ingest pushes each new candle (pushCandle); the prediction pushed
+ * back is cached in `latest`, so signal generation reads it (getLatest)
+ * instead of asking again when it is scoring the same candle at the same price.
+ */
+class MlStreamService {
+  constructor() {
+    const httpUrl = process.env.ML_SERVICE_URL || 'http://localhost:8001';
+    this.url = `${httpUrl.replace(/^http/, 'ws')}/ws/predict`;
+    this.ws = null;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.latest = new Map();
+    this.reconnectDelay = RECONNECT_MIN_MS;
+    this.reconnectTimer = null;
+  }
+
+  isOpen() {
+    return this.ws !== null && this.ws.readyState === WebSocket.OPEN;
+  }
+
+  connect() {
+    if (this.ws || this.reconnectTimer) return;
+
+    const ws = new WebSocket(this.url);
+    this.ws = ws;
+
+    ws.on('open', () => {
+      this.reconnectDelay = RECONNECT_MIN_MS;
+      logger.info(`ML stream connected: ${this.url}`);
+    });
+
+    ws.on('message', (data) => this._onMessage(data));
+
+    ws.on('close', () => {
+      this.ws = null;
+      this._failPending(new Error('ML stream closed'));
+      this._scheduleReconnect();
+    });
+
+    // 'close' always follows 'error'; reconnect is handled there
+    ws.on('error', (err) => logger.warn(`ML stream error: ${err.message}`));
+  }
+
+  _scheduleReconnect() {
+    if (this.reconnectTimer) return;
+    const delay = this.reconnectDelay;
+    this.reconnectDelay = Math.min(this.reconnectDelay * 2, RECONNECT_MAX_MS);
+    this.reconnectTimer = setTimeout(() => {
+      this.reconnectTimer = null;
+      this.connect();
+    }, delay);
+    this.reconnectTimer.unref();
+  }
+
+  _failPending(error) {
+    for (const { reject, timer } of this.pending.values()) {
+      clearTimeout(timer);
+      reject(error);
+    }
+    this.pending.clear();
+  }
+
+  _onMessage(data) {
+    let message;
+    try {
+      message = JSON.parse(data.toString());
+    } catch (err) {
+      logger.warn('ML stream: unparseable message');
+      return;
+    }
+
+    if (message.id !== null && message.id !== undefined) {
+      const entry = this.pending.get(message.id);
+      if (!entry) return; // already timed out
+      this.pending.delete(message.id);
+      clearTimeout(entry.timer);
+      if (message.type === 'prediction') entry.resolve(message);
+      else entry.reject(new Error(message.detail || 'ML stream error'));
+      return;
+    }
+
+    if (message.type === 'prediction') {
+      this.latest.set(`${message.symbol}:${message.timeframe}`, message);
+    } else if (message.type === 'error') {
+      logger.warn(`ML stream error reply: ${message.detail}`);
+    }
+  }
+
+  /**
+   * Request a prediction over the stream. Rejects immediately when the socket
+   * is down or MAX_PENDING requests are in flight, so callers can fall back.
+   */
+  predict(symbol, timeframe, indicators, { timeout = 5000 } = {}) {
+    if (!this.isOpen()) {
+      this.connect();
+      return Promise.reject(new Error('ML stream not connected'));
+    }
+    if (this.pending.size >= MAX_PENDING || this.ws.bufferedAmount > MAX_BUFFERED_BYTES) {
+      return Promise.reject(new Error('ML stream backpressure: too many pending requests'));
+    }
+
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        const error = new Error(`ML stream timeout after ${timeout}ms`);
+        error.code = 'ML_STREAM_TIMEOUT';
+        reject(error);
+      }, timeout);
+      this.pending.set(id, { resolve, reject, timer });
+      this.ws.send(JSON.stringify({ type: 'predict', id, symbol, timeframe, indicators }));
+    });
+  }
+
+  /**
+   * Feature payload the ML service expects, from a stored indicator row.
+   * `close` feeds the price_to_ema / price_to_vwap features.
+   */
+  toMlIndicators(indicators, close) {
+    return {
+      rsi: parseFloat(indicators.rsi), macd: parseFloat(indicators.macd),
+      macdSignal: parseFloat(indicators.macdSignal), ema9: parseFloat(indicators.ema9),
+      ema21: parseFloat(indicators.ema21), ema50: parseFloat(indicators.ema50),
+      ema200: parseFloat(indicators.ema200) || 0,
+      atr: parseFloat(indicators.atr), vwap: parseFloat(indicators.vwap),
+      adx: parseFloat(indicators.adx) || 25,
+      bbWidth: parseFloat(indicators.bbWidth) || 4,
+      close,
+    };
+  }
+
+  /**
+   * Fire-and-forget push of a new candle's indicators; the prediction arrives
+   * later and is served by getLatest(). Returns false if not sent.
+   */
+  pushCandle(symbol, timeframe, indicators, candleTimestamp) {
+    if (!this.isOpen()) {
+      this.connect();
+      return false;
+    }
+    this.ws.send(JSON.stringify({
+      type: 'candle', symbol, timeframe, indicators, candle_timestamp: String(candleTimestamp),
+    }));
+    return true;
+  }
+
+  /**
+   * Pushed prediction for the candle at candleTimestamp scored with this
+   * close, or null if it has not arrived, a different candle was pushed last,
+   * or the price has moved since (price_to_ema / price_to_vwap would differ).
+   */
+  getLatest(symbol, timeframe, candleTimestamp, close) {
+    const latest = this.latest.get(`${symbol}:${timeframe}`);
+    if (!latest || latest.candle_timestamp !== String(candleTimestamp)) return null;
+    if (latest.close !== close) {
+      logger.debug(
+        `Pushed ML prediction for ${symbol} ${timeframe} scored at close ${latest.close}, live price ${close}; re-predicting`
+      );
+      return null;
+    }
+    return latest;
+  }
+}
+
+module.exports = new MlStreamService();
@@ -12,6 +12,7 @@ const structureService = require('./marketStructure.service');
 const riskManager = require('./riskManager.service');
 const redditService = require('./reddit.service');
 const onchainService = require('./onchain.service');
+const mlStream = require('./mlStream.service');
 const { setCache, getCache } = require('../database/config/redis');
 const logger = require('../utils/logger');
 
@@ -21,6 +22,31 @@ const SIGNAL_COOLDOWN_MINUTES = 15;
 class SignalService {
   constructor() {
     this.mlServiceUrl = process.env.ML_SERVICE_URL || 'http://localhost:8001';
+    mlStream.connect();
+  }
+
+  /**
+   * ML direction prediction: the prediction pushed for this candle when
+   * indicators were ingested (only if it was scored at the same close as
+   * `indicators.close`), else a request over the persistent WebSocket
+   * stream, else one-off HTTP POST /predict if the stream is down.
+   */
+  async _predictMl(symbol, timeframe, indicators, candleTimestamp) {
+    const pushed = mlStream.getLatest(symbol, timeframe, candleTimestamp, indicators.close);
+    if (pushed) return pushed;
+    try {
+      return await mlStream.predict(symbol, timeframe, indicators, { timeout: 5000 });
+    } catch (streamError) {
+      // A timeout means the ML service is saturated; retrying over HTTP would only add load
+      if (streamError.code === 'ML_STREAM_TIMEOUT') throw streamError;
+      logger.debug(`ML stream unavailable (${streamError.message}), using HTTP`);
+      // Same budget as the client timeout, so the ML service sheds the request
+      // with a fast 503 instead of computing an answer nobody will read
+      const res = await axios.post(`${this.mlServiceUrl}/predict`, {
+        symbol, timeframe, indicators,
+      }, { timeout: 5000, headers: { 'X-Request-Timeout-Ms': '5000' } });
+      return res.data;
+    }
   }
 
   /**
@@ -132,19 +158,9 @@ class SignalService {
         marketService.getVolumeAnalysis(symbol, timeframe),
         newsService.getNewsSentiment(),
         marketIntelService.getAllIntel(symbol),
-        axios.post(`${this.mlServiceUrl}/predict`, {
-          symbol, timeframe,
-          indicators: {
-            rsi: parseFloat(indicators.rsi), macd: parseFloat(indicators.macd),
-            macdSignal: parseFloat(indicators.macdSignal), ema9: parseFloat(indicators.ema9),
-            ema21: parseFloat(indicators.ema21), ema50: parseFloat(indicators.ema50),
-            ema200: parseFloat(indicators.ema200) || 0,
-            atr: parseFloat(indicators.atr), vwap: parseFloat(indicators.vwap),
-            adx: parseFloat(indicators.adx) || 25,
-            bbWidth: parseFloat(indicators.bbWidth) || 4,
-            close: currentPrice, // required for correct price_to_ema / price_to_vwap features
-          },
-        }, { timeout: 5000 }),
+        this._predictMl(
+          symbol, timeframe, mlStream.toMlIndicators(indicators, currentPrice), indicators.timestamp
+        ),
         redditService.getSentiment(),
         onchainService.getAllOnchain(symbol),
       ]);
@@ -153,7 +169,7 @@ class SignalService {
       const volumeData = volumeAnalysis.status === 'fulfilled' ? volumeAnalysis.value : { volumeRatio: 1 };
       const newsSentiment = newsResult.status === 'fulfilled' ? newsResult.value : null;
       const marketIntel = marketIntelResult.status === 'fulfilled' ? marketIntelResult.value : null;
-      let mlPrediction = mlResult.status === 'fulfilled' ? mlResult.value.data : null;
+      let mlPrediction = mlResult.status === 'fulfilled' ? mlResult.value : null;
       if (!mlPrediction) {
         mlPrediction = {
           direction: indicatorAnalysis.signal === 'bullish' ? 'up' : indicatorAnalysis.signal === 'bearish' ? 'down' : 'neutral',
@@ -0,0 +1,400 @@
+"""
+Benchmark suite for the ML service hot paths.
+
+Runs entirely on synthetic data (create_mock_data with a fixed seed) in a
+throwaway MODEL_PATH, so it never touches Postgres or the real models/ dir.
+
+Usage (from ml-service/):
+    python -m benchmarks.run_benchmarks                       # run, write results.json
+    python -m benchmarks.run_benchmarks --save-baseline       # also store as baseline
+    python -m benchmarks.run_benchmarks --sizes 500 5000 --tolerance 0.15
+
+Results are compared against benchmarks/baseline.json when present; any
+benchmark whose median is slower than baseline by more than --tolerance is
+reported as a regression and the process exits with status 1. The run also
+checks that the float32 pipeline matches float64 input accuracy to within
+--parity-tolerance (exit status 1 otherwise).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results.json')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_SIZES = [500, 2000, 10000]
+PARITY_SIZE = 5000
+SEED = 42
+
+SENTIMENT_TEMPLATES = [
+    ('ETH looks bullish, breakout to ath incoming', 1),
+    ('Huge rally and institutional adoption for ethereum', 1),
+    ('Accumulate before the upgrade, strong upside', 1),
+    ('Market crash, panic selling everywhere', -1),
+    ('Bearish correction, expect more dump and fear', -1),
+    ('Rekt again, capitulation and collapse', -1),
+    ('Ethereum developer call notes for this week', 0),
+    ('What wallet do you use for staking', 0),
+    ('Gas fees today compared to last month', 0),
+]
+
+PREDICT_INDICATORS = {
+    'rsi': 55.0, 'macd': 1.2, 'macdSignal': 0.8, 'ema9': 2010.0, 'ema21': 2000.0,
+    'ema50': 1990.0, 'ema200': 1900.0, 'atr': 30.0, 'vwap': 2005.0, 'adx': 28.0,
+    'bbWidth': 3.5, 'close': 2012.0,
+}
+
+
+def _setup_environment(workdir):
+    """Point every on-disk artifact at workdir before service modules are imported."""
+    os.environ['MODEL_PATH'] = os.path.join(workdir, 'models')
+    os.environ['PROFILE_PATH'] = os.path.join(workdir, 'profiles')
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['ALLOW_MOCK_DATA'] = 'true'
+    os.makedirs(os.environ['MODEL_PATH'], exist_ok=True)
+    if SERVICE_DIR not in sys.path:
+        sys.path.insert(0, SERVICE_DIR)
+
+    import services.sentiment_collector as sentiment_collector
+    import services.sentiment_model as sentiment_model
+    sentiment_collector.DB_PATH = os.path.join(workdir, 'sentiment_training.db')
+    sentiment_model.MODEL_PATH = os.path.join(workdir, 'models', 'sentiment_model.joblib')
+
+
+def measure(fn, repeat, warmup=1):
+    """Run fn repeat times (after warmup) and summarise wall-clock seconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        'repeat': repeat,
+        'min': samples[0],
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'p95': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+    }
+
+
+def _mock_frame(size):
+    import numpy as np
+    from utils.database import create_mock_data
+    np.random.seed(SEED)
+    return create_mock_data(size)
+
+
+def _sentiment_corpus(n):
+    texts, labels = [], []
+    for i in range(n):
+        text, label = SENTIMENT_TEMPLATES[i % len(SENTIMENT_TEMPLATES)]
+        texts.append(f'{text} #{i}')
+        labels.append(label)
+    return texts, labels
+
+
+def bench_features(results, sizes, repeat):
+    from services.feature_engineering import FeatureEngineer
+    engineer = FeatureEngineer()
+    for size in sizes:
+        df = _mock_frame(size)
+        results[f'extract_features[{size}]'] = measure(
+            lambda: engineer.extract_features_from_dataframe(df), repeat)
+        results[f'create_labels[{size}]'] = measure(
+            lambda: engineer.create_labels(df, look_ahead=5, threshold=0.005), repeat)
+
+
+def bench_training(results, sizes, repeat):
+    import numpy as np
+    from services.model_trainer import ModelTrainer
+    trainer = ModelTrainer()
+
+    def train(size):
+        np.random.seed(SEED)
+        asyncio.run(trainer.train_model(lookback_periods=size))
+
+    for size in sizes:
+        results[f'train_model[{size}]'] = measure(lambda: train(size), max(1, repeat // 5), warmup=0)
+
+
+def bench_model_load(results, repeat):
+    from services.predictor import Predictor
+    predictor = Predictor()
+    results['model_load'] = measure(predictor.load_model, repeat)
+
+
+def bench_predict_api(results, repeat, batch_sizes=(1, 16, 64)):
+    from fastapi.testclient import TestClient
+    import main
+
+    main.predictor.load_model()
+    client = TestClient(main.app)
+    payload = {'symbol': 'ETHUSDT', 'timeframe': '1h', 'indicators': PREDICT_INDICATORS}
+
+    def call():
+        response = client.post('/predict', json=payload)
+        response.raise_for_status()
+
+    for batch in batch_sizes:
+        stats = measure(lambda: [call() for _ in range(batch)], repeat)
+        stats['per_request_median'] = stats['median'] / batch
+        results[f'predict_api[x{batch}]'] = stats
+
+
+def bench_binary_vs_json(results, repeat, batch_sizes=(1, 4, 16, 64, 256, 1024)):
+    """/predict/binary (one call per batch) against N JSON /predict calls."""
+    import numpy as np
+    from fastapi.testclient import TestClient
+    import main
+    from services.feature_engineering import INDICATOR_FIELDS
+    from utils import binary_protocol
+
+    client = TestClient(main.app)
+    row = [PREDICT_INDICATORS.get(name, np.nan) for name in INDICATOR_FIELDS]
+    payload = {'symbol': 'ETHUSDT', 'timeframe': '1h', 'indicators': PREDICT_INDICATORS}
+    headers = {'content-type': binary_protocol.CONTENT_TYPE}
+
+    def json_calls(batch):
+        for _ in range(batch):
+            client.post('/predict', json=payload).raise_for_status()
+
+    def binary_call(body):
+        response = client.post('/predict/binary', content=body, headers=headers)
+        response.raise_for_status()
+        binary_protocol.decode_response(response.content)
+
+    for batch in batch_sizes:
+        body = binary_protocol.encode_request(np.tile(row, (batch, 1)))
+        binary = measure(lambda: binary_call(body), repeat)
+        binary['per_row_median'] = binary['median'] / batch
+        results[f'predict_binary[x{batch}]'] = binary
+
+        json_stats = measure(lambda: json_calls(batch), min(repeat, 3))
+        json_stats['per_row_median'] = json_stats['median'] / batch
+        json_stats['binary_speedup'] = round(json_stats['median'] / binary['median'], 2)
+        results[f'predict_json[x{batch}]'] = json_stats
+
+
+def bench_ensemble(results, repeat, batch_sizes=(1, 256, 4096)):
+    """Ensemble predict_proba against its slowest member (members run in parallel)."""
+    import numpy as np
+    from services.ensemble import fit_ensemble, DEFAULT_MEMBERS
+    from services.model_trainer import ModelTrainer
+
+    features, labels = ModelTrainer().features_and_labels(_mock_frame(2000), horizons=(5, 15))
+    ensemble = fit_ensemble(features, labels, DEFAULT_MEMBERS)
+    rng = np.random.RandomState(SEED)
+
+    for batch in batch_sizes:
+        X = features[rng.randint(0, len(features), batch)]
+        member_medians = {}
+        for member in ensemble.members:
+            stats = measure(lambda: member['model'].predict_proba(X), repeat)
+            member_medians[member['name']] = stats['median']
+            results[f"ensemble_member_{member['name']}[x{batch}]"] = stats
+        stats = measure(lambda: ensemble.predict_proba(X), repeat)
+        stats['vs_slowest_member'] = round(stats['median'] / max(member_medians.values()), 2)
+        stats['vs_sum_of_members'] = round(stats['median'] / sum(member_medians.values()), 2)
+        results[f'ensemble_predict[x{batch}]'] = stats
+
+
+def bench_signal_evaluator(results, repeat, sizes=(10000, 50000)):
+    """Full-history signal evaluation: features, one batched inference, vectorised exits."""
+    from services.feature_engineering import FeatureEngineer
+    from services.predictor import Predictor
+    from services.signal_evaluator import SignalEvaluator
+
+    predictor = Predictor()
+    predictor.load_model()
+    evaluator = SignalEvaluator(FeatureEngineer(), predictor)
+    for size in sizes:
+        df = _mock_frame(size)
+        results[f'signal_evaluate[{size}]'] = measure(
+            lambda: evaluator.evaluate_frame(df, 'ETHUSDT', '1h'), max(1, repeat // 5)
+        )
+
+
+def bench_sentiment(results, repeat, batch_sizes=(1, 32, 256)):
+    from services.sentiment_model import SentimentModel
+    model = SentimentModel()
+    texts, labels = _sentiment_corpus(600)
+    train_result = model.train(texts, labels)
+    if not train_result.get('success'):
+        raise RuntimeError(f"Sentiment training failed: {train_result.get('reason')}")
+
+    # Model cost: every text is a cache miss
+    cache_size, model.cache_size = model.cache_size, 0
+    results['sentiment_predict'] = measure(lambda: model.predict(texts[0]), repeat * 5)
+    for batch in batch_sizes:
+        chunk = texts[:batch]
+        stats = measure(lambda: model.predict_batch(chunk), repeat)
+        stats['per_text_median'] = stats['median'] / batch
+        results[f'sentiment_predict_batch[{batch}]'] = stats
+
+    # Steady state: texts re-sent every cycle are served from the cache
+    model.cache_size = cache_size
+    results['sentiment_predict_cached'] = measure(lambda: model.predict(texts[0]), repeat * 5)
+    chunk = texts[:max(batch_sizes)]
+    stats = measure(lambda: model.predict_batch(chunk), repeat)
+    stats['per_text_median'] = stats['median'] / len(chunk)
+    results[f'sentiment_predict_batch_cached[{len(chunk)}]'] = stats
+
+
+def accuracy_parity(size=PARITY_SIZE):
+    """
+    Train and evaluate on the same seeded history twice: once from a raw
+    float64 frame with float64 features (the pre-schema pipeline) and once
+    from the float32-schema frame. Reports both accuracies, how often the
+    two models agree on the test rows, and memory per representation.
+    """
+    import numpy as np
+    from services.model_trainer import ModelTrainer, fit_and_evaluate
+    from utils.database import create_mock_data
+    from utils.dtypes import apply_schema
+
+    np.random.seed(SEED)
+    raw = create_mock_data(size, schema=False)
+    trainer = ModelTrainer()
+    report, predictions = {}, {}
+    for name, df in (('float64', raw), ('float32', apply_schema(raw.copy()))):
+        X_train, X_test, y_train, y_test = trainer.prepare_dataset(df)
+        if name == 'float64':
+            X_train, X_test = X_train.astype(np.float64), X_test.astype(np.float64)
+        _, accuracy, predictions[name] = fit_and_evaluate(X_train, y_train, X_test, y_test)
+        report[name] = {
+            'accuracy': round(float(accuracy), 6),
+            'frame_bytes': int(df.memory_usage(deep=True).sum()),
+            'feature_bytes': int(X_train.nbytes + X_test.nbytes),
+        }
+    report['rows'] = size
+    report['accuracy_delta'] = round(report['float32']['accuracy'] - report['float64']['accuracy'], 6)
+    report['prediction_agreement'] = round(float(np.mean(predictions['float32'] == predictions['float64'])), 6)
+    return report
+
+
+def environment_info():
+    import numpy
+    import pandas
+    import sklearn
+    import xgboost
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return (name, baseline_median, current_median, ratio) for each regression."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base or not base.get('median'):
+            continue
+        ratio = stats['median'] / base['median']
+        stats['baseline_median'] = base['median']
+        stats['ratio_vs_baseline'] = round(ratio, 3)
+        if ratio > 1 + tolerance:
+            regressions.append((name, base['median'], stats['median'], ratio))
+    return regressions
+
+
+def run(sizes, repeat):
+    results = {}
+    bench_features(results, sizes, repeat)
+    bench_training(results, sizes, repeat)
+    bench_model_load(results, repeat)
+    bench_predict_api(results, repeat)
+    bench_binary_vs_json(results, repeat)
+    bench_ensemble(results, repeat)
+    bench_signal_evaluator(results, repeat)
+    bench_sentiment(results, repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ML service benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Synthetic dataset sizes (rows)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repetitions per benchmark')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write results JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed median slowdown vs baseline before flagging (0.2 = 20%%)')
+    parser.add_argument('--parity-tolerance', type=float, default=0.01,
+                        help='Allowed |accuracy| difference between float32 and float64 inputs')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='ml-bench-')
+    try:
+        _setup_environment(workdir)
+        import logging
+        logging.disable(logging.WARNING)
+        results = run(args.sizes, args.repeat)
+        parity = accuracy_parity()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment_info(),
+        'config': {'sizes': args.sizes, 'repeat': args.repeat, 'seed': SEED},
+        'results': results,
+        'accuracy_parity': parity,
+        'regressions': [
+            {'benchmark': n, 'baseline_median': b, 'median': c, 'ratio': round(r, 3)}
+            for n, b, c, r in regressions
+        ],
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    width = max(len(name) for name in results)
+    for name, stats in results.items():
+        ratio = stats.get('ratio_vs_baseline')
+        suffix = f'  x{ratio:.2f} vs baseline' if ratio is not None else ''
+        print(f'{name:<{width}}  median {stats["median"] * 1000:10.3f} ms  p95 {stats["p95"] * 1000:10.3f} ms{suffix}')
+    print(f"\nfloat32 vs float64 accuracy: {parity['float32']['accuracy']:.4f} vs "
+          f"{parity['float64']['accuracy']:.4f} (agreement {parity['prediction_agreement']:.2%}, "
+          f"frame {parity['float32']['frame_bytes'] / parity['float64']['frame_bytes']:.0%} of float64 size)")
+    print(f'\nResults written to {args.output}')
+
+    if abs(parity['accuracy_delta']) > args.parity_tolerance:
+        print(f"\nfloat32 accuracy parity failed: delta {parity['accuracy_delta']:+.4f} "
+              f"beyond {args.parity_tolerance}")
+        return 1
+
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:')
+        for name, base, current, ratio in regressions:
+            print(f'  {name}: {base * 1000:.3f} ms -> {current * 1000:.3f} ms (x{ratio:.2f})')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Production serving config: gunicorn master + uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+preload_app imports main.py (and so loads the XGBoost, fallback and
+sentiment models) once in the master; workers are forked afterwards and
+share those pages copy-on-write. After /train in any worker, the others
+pick up the new latest_model_* within MODEL_RELOAD_INTERVAL seconds.
+"""
+import gc
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv('ML_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+
+# Training requests can run for minutes inside a worker
+timeout = int(os.getenv('ML_WORKER_TIMEOUT', '600'))
+graceful_timeout = 30
+keepalive = 5
+
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+accesslog = '-'
+
+
+def when_ready(server):
+    # Move everything allocated during preload into the permanent generation so
+    # the cyclic GC in workers never writes to (and un-shares) those pages.
+    gc.freeze()
+    server.log.info(f"Models preloaded; forking {workers} workers")
@@ -1,20 +1,35 @@
 import os
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import PlainTextResponse, FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 import uvicorn
+import numpy as np
 import logging
 from datetime import datetime
 
-from services.feature_engineering import FeatureEngineer
+from services.feature_engineering import FeatureEngineer, INDICATOR_FIELDS
 from services.model_trainer import ModelTrainer
+from services.batch_trainer import BatchTrainer
+from services.ensemble import EnsembleTrainer, DEFAULT_MEMBERS
 from services.predictor import Predictor
 from services.sentiment_collector import SentimentCollector
 from services.sentiment_model import SentimentModel
+from services.sentiment_features import SentimentFeatureIndex
+from services.prediction_stream import PredictionStream
+from services.drift import DriftMonitor
+from services.explainer import Explainer
+from services.signal_evaluator import SignalEvaluator
+from utils.metrics import render_metrics, FEATURE_ENGINEERING_SECONDS
+from utils import binary_protocol
+from utils.profiling import profile_request, profile_stage, list_profiles, profile_file
+from utils.database import DatabaseError, NoTrainingDataError, dispose_engine, pool_status
+from utils.candle_store import CandleStore
+from utils.admission import AdmissionController, AdmissionMiddleware, run_blocking
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
@@ -25,6 +40,11 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Added first, so CORS (added after it) wraps it: 503 rejections still carry
+# CORS headers and preflights are answered without taking a slot
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 _BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:3001')
 app.add_middleware(
     CORSMiddleware,
@@ -34,11 +54,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-feature_engineer = FeatureEngineer()
-model_trainer = ModelTrainer()
-predictor = Predictor()
 sentiment_collector = SentimentCollector()
 sentiment_model = SentimentModel()
+sentiment_index = SentimentFeatureIndex()
+sentiment_index.refresh(sentiment_collector)
+
+feature_engineer = FeatureEngineer(sentiment_index=sentiment_index)
+candle_store = CandleStore()
+model_trainer = ModelTrainer(sentiment_index=sentiment_index, candle_store=candle_store)
+predictor = Predictor()
+batch_trainer = BatchTrainer(model_trainer, predictor)
+ensemble_trainer = EnsembleTrainer(model_trainer, predictor)
+drift_monitor = DriftMonitor(predictor)
+explainer = Explainer(predictor)
+signal_evaluator = SignalEvaluator(feature_engineer, predictor, candle_store=candle_store)
+prediction_stream = PredictionStream(
+    feature_engineer, predictor,
+    before_batch=lambda: sentiment_index.refresh_if_stale(sentiment_collector),
+    drift_monitor=drift_monitor
+)
 
 
 class PredictionRequest(BaseModel):
@@ -51,6 +85,76 @@ class TrainRequest(BaseModel):
     symbol: str = "ETHUSDT"
     timeframe: str = "1h"
     lookback_periods: int = 500
+    # 'incremental' / 'refresh' warm-start from the current model (see ModelTrainer.train_model)
+    mode: Literal['full', 'incremental', 'refresh'] = 'full'
+    # Epoch-ms [start, end) range read from the local candle store instead of the latest rows
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+
+class BatchTrainRequest(BaseModel):
+    symbols: List[str] = ["ETHUSDT"]
+    timeframes: List[str] = ["1h"]
+    lookback_periods: int = 500
+    cpu_budget: Optional[int] = None
+
+
+class EnsembleTrainRequest(BaseModel):
+    symbol: str = "ETHUSDT"
+    timeframe: str = "1h"
+    lookback_periods: int = 500
+    members: List[str] = DEFAULT_MEMBERS
+    aggregation: Literal['weighted', 'stacked'] = 'weighted'
+    # Fixed member weights for 'weighted'; learned from a blend split when omitted
+    weights: Optional[List[float]] = None
+    # Epoch-ms [start, end) range read from the local candle store instead of the latest rows
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+
+def _profiling_requested(http_request: Request, profile: bool) -> bool:
+    """Profiling is opt-in via ?profile=true or an 'X-Profile: 1' header."""
+    header = http_request.headers.get('x-profile', '').lower()
+    return profile or header in ('1', 'true', 'yes')
+
+
+class ExplainRequest(PredictionRequest):
+    top_k: int = 5
+    # Saabas path attribution instead of exact TreeSHAP (much cheaper, less exact)
+    approximate: bool = False
+
+
+class ExplainBatchRequest(BaseModel):
+    symbol: str
+    timeframe: str
+    rows: List[Dict[str, float]]
+    top_k: int = 5
+    approximate: bool = False
+
+
+EXPLAIN_MAX_ROWS = 1024
+
+
+class SignalEvaluationRequest(BaseModel):
+    symbol: str = "ETHUSDT"
+    timeframe: str = "1h"
+    lookback_periods: int = 5000
+    start: Optional[int] = None
+    end: Optional[int] = None
+    # Defaults match the backend risk manager (1.5 x ATR stop, TP1 at 1.5R)
+    atr_multiplier: float = 1.5
+    reward_ratio: float = 1.5
+    max_hold_bars: int = 48
+
+
+class CandleSyncRequest(BaseModel):
+    symbol: str = "ETHUSDT"
+    timeframe: str = "1h"
+    # Rebuild from the first stored candle instead of appending newer rows
+    full: bool = False
+
+
+CANDLE_RANGE_MAX_ROWS = 10000
 
 
 class PredictionResponse(BaseModel):
@@ -75,30 +179,53 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "model_loaded": predictor.is_model_loaded()
+        "model_loaded": predictor.is_model_loaded(),
+        "database": pool_status(),
+        "admission": admission.status()
     }
 
 
+@app.on_event("shutdown")
+async def close_database():
+    await dispose_engine()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus text-format metrics (latency histograms and fallback counters)
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_price_direction(request: PredictionRequest):
     """
     Predict price direction based on technical indicators
     """
     try:
-        logger.info(f"Prediction request for {request.symbol} {request.timeframe}")
+        logger.debug(f"Prediction request for {request.symbol} {request.timeframe}")
 
-        features = feature_engineer.prepare_features_for_prediction(request.indicators)
+        sentiment_index.refresh_if_stale(sentiment_collector)
 
-        prediction = predictor.predict(features)
+        with FEATURE_ENGINEERING_SECONDS.time(mode='predict'):
+            features = feature_engineer.prepare_features_for_prediction(request.indicators)
 
-        direction = "up" if prediction["direction"] == 1 else "down" if prediction["direction"] == -1 else "neutral"
+        prediction = predictor.predict(features, request.symbol, request.timeframe)
 
-        confidence_level = "high" if prediction["probability"] > 0.75 else "medium" if prediction["probability"] > 0.6 else "low"
+        drift_monitor.observe(
+            request.symbol, request.timeframe,
+            [[features[name] for name in feature_engineer.feature_names]],
+            feature_engineer.feature_names,
+            [[request.indicators.get(name, np.nan) for name in INDICATOR_FIELDS]]
+        )
+
+        direction = "up" if prediction["direction"] == 1 else "down" if prediction["direction"] == -1 else "neutral"
 
         return PredictionResponse(
             direction=direction,
             probability=round(prediction["probability"], 4),
-            confidence=confidence_level,
+            confidence=prediction["confidence"],
             features_used=features,
             timestamp=int(datetime.now().timestamp() * 1000)
         )
@@ -108,34 +235,345 @@ async def predict_price_direction(request: PredictionRequest):
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
-@app.post("/train")
-async def train_model(request: TrainRequest):
+@app.post("/predict/binary")
+async def predict_binary(http_request: Request):
     """
-    Train a new model on historical data
+    Batched prediction over the compact binary framing in utils/binary_protocol.py.
+    Body: float64 indicator rows in INDICATOR_FIELDS order; response: direction,
+    confidence code and probability arrays. No pydantic models or JSON on this path.
     """
     try:
-        logger.info(f"Training model for {request.symbol} {request.timeframe}")
+        body = await http_request.body()
+        indicators = binary_protocol.decode_request(body, max_cols=len(INDICATOR_FIELDS))
+    except binary_protocol.ProtocolError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        sentiment_index.refresh_if_stale(sentiment_collector)
+
+        with FEATURE_ENGINEERING_SECONDS.time(mode='predict_batch'):
+            features = feature_engineer.prepare_feature_matrix(indicators)
+
+        directions, probabilities, confidence_codes = predictor.predict_batch(
+            features, feature_engineer.feature_names
+        )
+        drift_monitor.observe(None, None, features, feature_engineer.feature_names, indicators)
+
+        return Response(
+            content=binary_protocol.encode_response(directions, confidence_codes, probabilities),
+            media_type=binary_protocol.CONTENT_TYPE
+        )
+
+    except Exception as e:
+        logger.error(f"Binary prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@app.websocket("/ws/predict")
+async def predict_stream(websocket: WebSocket):
+    """
+    Persistent, pipelined prediction channel; see services/prediction_stream.py
+    """
+    await prediction_stream.serve(websocket)
+
+
+@app.post("/explain")
+async def explain_prediction(request: ExplainRequest):
+    """
+    Per-feature contributions (TreeSHAP) behind the direction predicted for these indicators
+    """
+    try:
+        features = feature_engineer.prepare_features_for_prediction(request.indicators)
+        explanation = explainer.explain_batch(
+            [[features[name] for name in feature_engineer.feature_names]],
+            feature_engineer.feature_names,
+            request.symbol, request.timeframe,
+            approximate=request.approximate, top_k=request.top_k
+        )[0]
+        return {
+            "success": True,
+            "data": explanation
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Explain error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Explanation failed: {str(e)}")
+
+
+@app.post("/explain/batch")
+async def explain_batch(request: ExplainBatchRequest):
+    """
+    Explanations for many indicator rows in one vectorized call
+    """
+    if len(request.rows) > EXPLAIN_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {EXPLAIN_MAX_ROWS} rows per request")
+    try:
+        indicators = np.array([
+            [row.get(name, np.nan) for name in INDICATOR_FIELDS] for row in request.rows
+        ], dtype=np.float64).reshape(len(request.rows), len(INDICATOR_FIELDS))
+        features = feature_engineer.prepare_feature_matrix(indicators)
+        explanations = explainer.explain_batch(
+            features, feature_engineer.feature_names,
+            request.symbol, request.timeframe,
+            approximate=request.approximate, top_k=request.top_k
+        )
+        return {
+            "success": True,
+            "data": explanations
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch explain error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Explanation failed: {str(e)}")
+
+
+@app.get("/explain/global")
+async def explain_global(symbol: str = "ETHUSDT", timeframe: str = "1h"):
+    """
+    Global feature importance precomputed when the serving model was trained
+    """
+    try:
+        data = explainer.global_importance(symbol, timeframe)
+        data["cache"] = explainer.cache_info()
+        return {
+            "success": True,
+            "data": data
+        }
+    except Exception as e:
+        logger.error(f"Global importance error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-        result = await model_trainer.train_model(
+@app.post("/evaluate/signals")
+async def evaluate_signals(request: SignalEvaluationRequest):
+    """
+    Replay stored candles through the serving model and score the resulting
+    trades per confidence bucket (hit rate, expectancy, drawdown)
+    """
+    if request.atr_multiplier <= 0 or request.reward_ratio <= 0 or request.max_hold_bars < 1:
+        raise HTTPException(status_code=400, detail="atr_multiplier, reward_ratio and max_hold_bars must be positive")
+    try:
+        report = await signal_evaluator.evaluate(
             symbol=request.symbol,
             timeframe=request.timeframe,
-            lookback_periods=request.lookback_periods
+            lookback_periods=request.lookback_periods,
+            start=request.start,
+            end=request.end,
+            atr_multiplier=request.atr_multiplier,
+            reward_ratio=request.reward_ratio,
+            max_hold_bars=request.max_hold_bars
         )
+        return {
+            "success": True,
+            "data": report
+        }
+    except NoTrainingDataError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DatabaseError as e:
+        logger.error(f"Training data unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Signal evaluation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Signal evaluation failed: {str(e)}")
 
-        predictor.load_model()
+
+@app.post("/train")
+async def train_model(request: TrainRequest, http_request: Request, profile: bool = False):
+    """
+    Train a new model on historical data
+    """
+    try:
+        logger.info(f"Training model for {request.symbol} {request.timeframe}")
+
+        with profile_request('train', _profiling_requested(http_request, profile)) as session:
+            result = await model_trainer.train_model(
+                symbol=request.symbol,
+                timeframe=request.timeframe,
+                lookback_periods=request.lookback_periods,
+                mode=request.mode,
+                start=request.start,
+                end=request.end
+            )
+
+            with profile_stage('load_model'):
+                predictor.publish(request.symbol, request.timeframe)
 
         return {
             "success": True,
             "message": "Model trained successfully",
             "metrics": result["metrics"],
-            "model_path": result["model_path"]
+            "model_path": result["model_path"],
+            "mode": result["mode"],
+            "fallback_reason": result["fallback_reason"],
+            "profile_id": session.id if session else None
         }
 
+    except NoTrainingDataError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DatabaseError as e:
+        logger.error(f"Training data unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Training error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
 
 
+@app.post("/train/batch")
+async def train_batch(request: BatchTrainRequest):
+    """
+    Train one model per symbol/timeframe pair; each is published as soon as it is saved
+    """
+    try:
+        result = await batch_trainer.train_all(
+            request.symbols,
+            request.timeframes,
+            lookback_periods=request.lookback_periods,
+            cpu_budget=request.cpu_budget
+        )
+        return {
+            "success": not result["errors"],
+            "data": result
+        }
+
+    except NoTrainingDataError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DatabaseError as e:
+        logger.error(f"Training data unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch training error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch training failed: {str(e)}")
+
+
+@app.post("/train/ensemble")
+async def train_ensemble(request: EnsembleTrainRequest, http_request: Request, profile: bool = False):
+    """
+    Train an ensemble of member models into one artifact and serve it for the symbol/timeframe
+    """
+    try:
+        with profile_request('train_ensemble', _profiling_requested(http_request, profile)) as session:
+            result = await ensemble_trainer.train(
+                symbol=request.symbol,
+                timeframe=request.timeframe,
+                lookback_periods=request.lookback_periods,
+                members=request.members,
+                aggregation=request.aggregation,
+                weights=request.weights,
+                start=request.start,
+                end=request.end
+            )
+
+        return {
+            "success": True,
+            "message": "Ensemble trained successfully",
+            "members": result["members"],
+            "aggregation": result["aggregation"],
+            "metrics": result["metrics"],
+            "model_path": result["model_path"],
+            "profile_id": session.id if session else None
+        }
+
+    except NoTrainingDataError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DatabaseError as e:
+        logger.error(f"Training data unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ensemble training error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ensemble training failed: {str(e)}")
+
+
+@app.post("/candles/sync")
+async def sync_candles(request: CandleSyncRequest):
+    """
+    Copy candles newer than the last locally stored one from the database
+    into the memory-mapped candle store
+    """
+    try:
+        return {
+            "success": True,
+            "data": await candle_store.sync(request.symbol, request.timeframe, full=request.full)
+        }
+    except DatabaseError as e:
+        logger.error(f"Candle sync unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Candle sync error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Candle sync failed: {str(e)}")
+
+
+@app.get("/candles")
+async def list_candles():
+    """
+    Series in the local candle store with their row counts and time bounds
+    """
+    return {
+        "success": True,
+        "data": candle_store.list_series()
+    }
+
+
+@app.get("/candles/range")
+async def candle_range(symbol: str = "ETHUSDT", timeframe: str = "1h",
+                       start: Optional[int] = None, end: Optional[int] = None,
+                       columns: Optional[str] = None):
+    """
+    Locally stored candles with start <= timestamp < end (epoch ms), column-oriented
+    """
+    try:
+        views = candle_store.range(
+            symbol, timeframe, start, end,
+            columns=columns.split(',') if columns else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if views is None:
+        raise HTTPException(status_code=404, detail=f"No local candles for {symbol} {timeframe}; sync first")
+    rows = len(views['timestamp'])
+    if rows > CANDLE_RANGE_MAX_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{rows} rows in range; at most {CANDLE_RANGE_MAX_ROWS} per request"
+        )
+    return {
+        "success": True,
+        "data": {
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "rows": rows,
+            "columns": {name: view.tolist() for name, view in views.items()}
+        }
+    }
+
+
+@app.get("/drift")
+async def get_drift(symbol: str = "ETHUSDT", timeframe: str = "1h"):
+    """
+    Live feature statistics vs. the serving model's training reference (PSI per feature)
+    """
+    try:
+        return {
+            "success": True,
+            "data": drift_monitor.report(symbol, timeframe)
+        }
+    except Exception as e:
+        logger.error(f"Drift report error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/drift/reset")
+async def reset_drift(symbol: Optional[str] = None, timeframe: Optional[str] = None):
+    """
+    Start a fresh live window (all models, or one symbol/timeframe)
+    """
+    drift_monitor.reset(symbol, timeframe)
+    return {"success": True}
+
+
 @app.get("/model/info")
 async def get_model_info():
     """
@@ -180,7 +618,7 @@ class SentimentBatchRequest(BaseModel):
 async def predict_sentiment(request: SentimentRequest):
     """Predict sentiment for a single text using trained ML model."""
     try:
-        result = sentiment_model.predict(request.text)
+        result = await run_blocking(sentiment_model.predict, request.text)
         return {"success": True, "data": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -190,7 +628,7 @@ async def predict_sentiment(request: SentimentRequest):
 async def predict_sentiment_batch(request: SentimentBatchRequest):
     """Predict sentiment for multiple texts efficiently."""
     try:
-        results = sentiment_model.predict_batch(request.texts)
+        results = await run_blocking(sentiment_model.predict_batch, request.texts)
         return {"success": True, "data": results, "count": len(results)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -200,7 +638,8 @@ async def predict_sentiment_batch(request: SentimentBatchRequest):
 async def collect_sentiment_data():
     """Collect today's Reddit posts and auto-label them for training."""
     try:
-        inserted = sentiment_collector.collect_and_store()
+        inserted = await run_blocking(sentiment_collector.collect_and_store)
+        await run_blocking(sentiment_index.refresh, sentiment_collector)
         stats = sentiment_collector.get_stats()
         return {"success": True, "inserted": inserted, "db_stats": stats}
     except Exception as e:
@@ -208,18 +647,20 @@ async def collect_sentiment_data():
 
 
 @app.post("/sentiment/train")
-async def train_sentiment_model():
+async def train_sentiment_model(http_request: Request, profile: bool = False):
     """Train sentiment model on all collected data."""
     try:
-        texts, labels = sentiment_collector.get_training_data(min_confidence=0.6)
-        if len(texts) < 50:
-            return {
-                "success": False,
-                "message": f"Not enough data yet: {len(texts)} samples. Need 50+. Run /sentiment/collect daily.",
-                "current_samples": len(texts)
-            }
-        result = sentiment_model.train(texts, labels)
-        return {"success": True, "training_result": result}
+        with profile_request('sentiment_train', _profiling_requested(http_request, profile)) as session:
+            with profile_stage('load_training_data'):
+                texts, labels = await run_blocking(sentiment_collector.get_training_data, min_confidence=0.6)
+            if len(texts) < 50:
+                return {
+                    "success": False,
+                    "message": f"Not enough data yet: {len(texts)} samples. Need 50+. Run /sentiment/collect daily.",
+                    "current_samples": len(texts)
+                }
+            result = await run_blocking(sentiment_model.train, texts, labels)
+        return {"success": True, "training_result": result, "profile_id": session.id if session else None}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -234,12 +675,37 @@ async def get_sentiment_model_info():
             "success": True,
             "model": model_info,
             "training_data": db_stats,
+            "feature_index": sentiment_index.get_info(),
             "ready_to_train": db_stats["total"] >= 50
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/profiles")
+async def get_profiles():
+    """List stored request profiles, newest first."""
+    return {"success": True, "data": list_profiles()}
+
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Stage timings and top functions for a stored profile."""
+    path = profile_file(profile_id, '.json')
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json")
+
+
+@app.get("/profiles/{profile_id}/download")
+async def download_profile(profile_id: str):
+    """Raw cProfile trace (.prof) for snakeviz / pstats."""
+    path = profile_file(profile_id, '.prof')
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile trace not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
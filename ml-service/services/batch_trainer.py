@@ -0,0 +1,128 @@
+"""
+Batch training across many (symbol, timeframe) pairs.
+
+One bulk DB query feeds every pair, features/labels are built in-process
+with the shared FeatureEngineer, and the XGBoost fits run in a process pool
+sized to a CPU budget: `processes` fits in parallel, each with
+`cpu_budget // processes` XGBoost threads, so the host is never
+oversubscribed. Each finished model is saved and published to the live
+Predictor as soon as its fit completes.
+"""
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from services.model_trainer import fit_and_evaluate, calibration_split
+from utils.admission import run_blocking
+from utils.database import get_training_data_bulk
+
+logger = logging.getLogger(__name__)
+
+TRAIN_CPU_BUDGET = int(os.getenv('TRAIN_CPU_BUDGET', '0')) or os.cpu_count() or 1
+
+
+class BatchTrainer:
+    """
+    Train and publish one model per symbol/timeframe pair
+    """
+
+    def __init__(self, model_trainer, predictor):
+        self.model_trainer = model_trainer
+        self.predictor = predictor
+
+    async def train_all(self, symbols, timeframes, lookback_periods=500, cpu_budget=None):
+        """
+        Returns {'models': [...], 'errors': [...]} with one entry per pair.
+        """
+        started = datetime.now()
+        cpu_budget = max(1, cpu_budget or TRAIN_CPU_BUDGET)
+        pairs = [(s, t) for s in symbols for t in timeframes]
+        logger.info(f"Batch training {len(pairs)} models with a budget of {cpu_budget} CPUs")
+
+        frames = await get_training_data_bulk(symbols, timeframes, lookback_periods)
+
+        datasets, trained_through, errors = {}, {}, []
+        for pair in pairs:
+            if pair not in frames:
+                errors.append({'symbol': pair[0], 'timeframe': pair[1], 'error': 'No training data stored'})
+                continue
+            try:
+                datasets[pair] = await run_blocking(self.model_trainer.prepare_dataset, frames[pair])
+                # Last fitted candle, so a later incremental run boosts only on newer rows
+                cal_idx = calibration_split(len(datasets[pair][0]))
+                trained_through[pair] = int(frames[pair]['timestamp'].iloc[cal_idx - 1])
+            except Exception as e:
+                logger.error(f"Dataset preparation failed for {pair[0]} {pair[1]}: {str(e)}")
+                errors.append({'symbol': pair[0], 'timeframe': pair[1], 'error': str(e)})
+
+        models = []
+        if datasets:
+            processes = min(len(datasets), cpu_budget)
+            threads = max(1, cpu_budget // processes)
+            # spawn, not fork: forking a process that already ran OpenMP
+            # (XGBoost/numpy threads) can deadlock in the child
+            context = multiprocessing.get_context('spawn')
+            loop = asyncio.get_running_loop()
+
+            with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+                pending = {}
+                for pair, (X_train, X_test, y_train, y_test) in datasets.items():
+                    # The training tail is left unfitted for calibration in _save
+                    cal_idx = calibration_split(len(X_train))
+                    future = loop.run_in_executor(
+                        pool, fit_and_evaluate,
+                        X_train[:cal_idx], y_train[:cal_idx], X_test, y_test, threads
+                    )
+                    pending[future] = pair
+                # Publish in completion order, not submission order
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        symbol, timeframe = pair = pending.pop(future)
+                        try:
+                            model, accuracy, _ = future.result()
+                            entry = await run_blocking(
+                                self._save, symbol, timeframe, model, accuracy, datasets[pair],
+                                trained_through[pair]
+                            )
+                            self.predictor.publish(symbol, timeframe)
+                            models.append(entry)
+                            logger.info(f"Published {symbol} {timeframe} model, accuracy {accuracy:.4f}")
+                        except Exception as e:
+                            logger.error(f"Training failed for {symbol} {timeframe}: {str(e)}")
+                            errors.append({'symbol': symbol, 'timeframe': timeframe, 'error': str(e)})
+
+        return {
+            'models': models,
+            'errors': errors,
+            'cpu_budget': cpu_budget,
+            'duration_seconds': round((datetime.now() - started).total_seconds(), 3)
+        }
+
+    def _save(self, symbol, timeframe, model, accuracy, dataset, trained_through=None):
+        """Calibrate and save one fitted model (blocking); returns its result entry."""
+        X_train, X_test, y_train, _ = dataset
+        cal_idx = calibration_split(len(X_train))
+        X_train, X_cal, y_cal = X_train[:cal_idx], X_train[cal_idx:], y_train[cal_idx:]
+        calibration = self.model_trainer.calibrate(model, X_cal, y_cal)
+        model_filepath = self.model_trainer.save_model(
+            model, symbol, timeframe, accuracy, calibration=calibration,
+            reference_stats=self.model_trainer.reference_stats(X_train),
+            global_importance=self.model_trainer.global_importance(model, X_train),
+            trained_through=trained_through
+        )
+        return {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'model_path': model_filepath,
+            'metrics': {
+                'accuracy': float(accuracy),
+                'training_samples': len(X_train),
+                'calibration_samples': len(X_cal),
+                'test_samples': len(X_test),
+                'confidence_thresholds': calibration['thresholds']
+            }
+        }
@@ -0,0 +1,133 @@
+"""
+Probability calibration and confidence thresholds for the direction model.
+
+Fitted at training time on a calibration slice (the chronologically last
+rows of the training split, which the model is not fitted on) and
+stored in the artifact as a small dict of plain arrays, so inference is one
+binary search (np.interp) on the top-class probability:
+
+    {'method': 'isotonic', 'x': [...], 'y': [...], 'thresholds': {...}}
+    {'method': 'temperature', 'temperature': T, 'thresholds': {...}}
+    {'method': 'constant', 'value': 1/3, 'thresholds': {...}}   # fallback model
+
+Calibrated values estimate P(predicted direction is correct). The
+'high'/'medium' thresholds are the lowest calibrated probabilities seen on
+validation that reach HIGH_PRECISION / MEDIUM_PRECISION, provided at least
+MIN_THRESHOLD_SUPPORT validation predictions clear them; None means the
+model never earned that label.
+"""
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+
+# Isotonic needs enough points to be stable; below this use temperature scaling
+ISOTONIC_MIN_SAMPLES = 200
+HIGH_PRECISION = 0.75
+MEDIUM_PRECISION = 0.6
+# Smallest validation bucket a threshold may be derived from
+MIN_THRESHOLD_SUPPORT = 20
+
+# Artifacts trained before calibration existed keep the old fixed cut-offs
+DEFAULT_THRESHOLDS = {'high': 0.75, 'medium': 0.6}
+
+CONFIDENCE_LABELS = np.array(['low', 'medium', 'high'])
+
+_TEMPERATURE_GRID = np.geomspace(0.25, 8.0, 121)
+
+
+def fit_calibration(probabilities: np.ndarray, y_true: np.ndarray) -> dict:
+    """
+    Fit calibration + thresholds from validation predict_proba output (n, classes)
+    and the true class indices.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    y_true = np.asarray(y_true)
+    top = probabilities.max(axis=1)
+    correct = (probabilities.argmax(axis=1) == y_true).astype(np.float64)
+
+    if len(top) >= ISOTONIC_MIN_SAMPLES:
+        isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(top, correct)
+        calibration = {
+            'method': 'isotonic',
+            'x': np.asarray(isotonic.X_thresholds_, dtype=np.float64),
+            'y': np.asarray(isotonic.y_thresholds_, dtype=np.float64),
+        }
+    else:
+        calibration = {
+            'method': 'temperature',
+            'temperature': _fit_temperature(probabilities, y_true),
+        }
+
+    calibration['thresholds'] = derive_thresholds(apply_calibration(calibration, probabilities))
+    calibration['validation_samples'] = int(len(top))
+    return calibration
+
+
+def _fit_temperature(probabilities, y_true):
+    """Temperature minimising validation NLL (grid search on a log scale)."""
+    log_p = np.log(np.clip(probabilities, 1e-12, 1.0))
+    rows = np.arange(len(y_true))
+    best_t, best_nll = 1.0, np.inf
+    for t in _TEMPERATURE_GRID:
+        scaled = log_p / t
+        scaled -= scaled.max(axis=1, keepdims=True)
+        log_norm = np.log(np.exp(scaled).sum(axis=1))
+        nll = float(np.mean(log_norm - scaled[rows, y_true]))
+        if nll < best_nll:
+            best_t, best_nll = float(t), nll
+    return best_t
+
+
+def derive_thresholds(calibrated: np.ndarray) -> dict:
+    """
+    Per-label threshold: the lowest validation calibrated probability that
+    reaches the label's target precision, if enough predictions clear it.
+    """
+    thresholds = {}
+    for name, target in (('high', HIGH_PRECISION), ('medium', MEDIUM_PRECISION)):
+        qualifying = calibrated[calibrated >= target]
+        thresholds[name] = float(qualifying.min()) if len(qualifying) >= MIN_THRESHOLD_SUPPORT else None
+    return thresholds
+
+
+def constant_calibration(n_classes=3) -> dict:
+    """Calibration for the untrained fallback model: chance level, always 'low'."""
+    return {
+        'method': 'constant',
+        'value': 1.0 / n_classes,
+        'thresholds': {'high': None, 'medium': None},
+    }
+
+
+def apply_calibration(calibration, probabilities: np.ndarray) -> np.ndarray:
+    """Calibrated top-class probability for each row of predict_proba output."""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    if not calibration:
+        return probabilities.max(axis=1)
+
+    method = calibration['method']
+    if method == 'isotonic':
+        return np.interp(probabilities.max(axis=1), calibration['x'], calibration['y'])
+    if method == 'temperature':
+        scaled = np.log(np.clip(probabilities, 1e-12, 1.0)) / calibration['temperature']
+        scaled -= scaled.max(axis=1, keepdims=True)
+        weights = np.exp(scaled)
+        return weights.max(axis=1) / weights.sum(axis=1)
+    if method == 'constant':
+        return np.full(len(probabilities), calibration['value'])
+    raise ValueError(f"Unknown calibration method: {method}")
+
+
+def thresholds_of(calibration) -> dict:
+    return (calibration or {}).get('thresholds') or DEFAULT_THRESHOLDS
+
+
+def confidence_codes(calibrated: np.ndarray, thresholds: dict) -> np.ndarray:
+    """0=low, 1=medium, 2=high per row (index into CONFIDENCE_LABELS)."""
+    high = thresholds.get('high')
+    medium = thresholds.get('medium')
+    codes = np.zeros(len(calibrated), dtype=np.uint8)
+    if medium is not None:
+        codes += calibrated >= medium
+    if high is not None:
+        codes += calibrated >= high
+    return codes
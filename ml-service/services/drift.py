@@ -0,0 +1,225 @@
+"""
+Feature drift detection for live prediction traffic.
+
+At training time `compute_reference_stats` summarises the training
+features (mean, variance, decile bin edges and the share of rows per bin)
+and the summary is saved in the model artifact. At serve time every
+feature row sent for prediction updates a `FeatureStream`: Welford
+mean/variance plus histogram counts over the reference bins, so memory
+is O(features x bins) no matter how much traffic arrives. Comparing the
+two gives a per-feature Population Stability Index:
+
+    PSI = sum_b (live_b - ref_b) * ln(live_b / ref_b)
+
+PSI < 0.1 is stable, 0.1-0.25 moderate, > 0.25 significant drift. The
+stream also counts indicators the caller left out (which get silently
+defaulted, e.g. adx=25 / bbWidth=4).
+"""
+import os
+import threading
+import logging
+from datetime import datetime
+
+import numpy as np
+
+from services.feature_engineering import INDICATOR_FIELDS
+
+logger = logging.getLogger(__name__)
+
+DRIFT_BINS = 10
+DRIFT_MIN_SAMPLES = int(os.getenv('DRIFT_MIN_SAMPLES', '200'))
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = float(os.getenv('DRIFT_PSI_THRESHOLD', '0.25'))
+_PSI_EPS = 1e-4
+
+# 'timestamp' only positions sentiment lookups; it is not a model input
+_TRACKED_INDICATORS = [name for name in INDICATOR_FIELDS if name != 'timestamp']
+
+
+def _bin_index(X, edges):
+    """Bin per value for X (n, f) against per-feature interior edges (f, bins-1)."""
+    return (X[:, :, None] > edges[None, :, :]).sum(axis=2)
+
+
+def _bin_counts(X, edges):
+    n_features, n_bins = edges.shape[0], edges.shape[1] + 1
+    flat = _bin_index(X, edges) + np.arange(n_features) * n_bins
+    return np.bincount(flat.ravel(), minlength=n_features * n_bins).reshape(n_features, n_bins)
+
+
+def compute_reference_stats(X, feature_names, bins=DRIFT_BINS) -> dict:
+    """Training-distribution summary stored in the artifact as 'reference_stats'."""
+    X = np.asarray(X, dtype=np.float64)
+    edges = np.quantile(X, np.linspace(0, 1, bins + 1)[1:-1], axis=0).T  # (features, bins-1)
+    counts = _bin_counts(X, edges)
+    return {
+        'feature_names': list(feature_names),
+        'n': int(len(X)),
+        'mean': X.mean(axis=0),
+        'var': X.var(axis=0),
+        'edges': edges,
+        'proportions': counts / max(len(X), 1),
+    }
+
+
+def psi(live_proportions, reference_proportions):
+    """Per-feature PSI for (features, bins) proportion arrays."""
+    live = np.clip(live_proportions, _PSI_EPS, None)
+    ref = np.clip(reference_proportions, _PSI_EPS, None)
+    return ((live - ref) * np.log(live / ref)).sum(axis=1)
+
+
+def _status(value):
+    if value > PSI_SIGNIFICANT:
+        return 'significant'
+    if value > PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+class FeatureStream:
+    """
+    O(1)-memory running statistics for one model's live feature rows
+    """
+
+    def __init__(self, feature_names, reference=None):
+        self.feature_names = list(feature_names)
+        self.reference = reference
+        n_features = len(self.feature_names)
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.hist = None if reference is None else np.zeros_like(reference['proportions'], dtype=np.int64)
+        self.missing = np.zeros(len(_TRACKED_INDICATORS), dtype=np.int64)
+        self.started_at = datetime.now().isoformat()
+
+    def update(self, X, missing_mask=None):
+        """Fold a batch of rows in (Chan et al. parallel form of Welford's update)."""
+        n = len(X)
+        if n == 0:
+            return
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * (n / total)
+        self.m2 += batch_m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+
+        if self.hist is not None:
+            self.hist += _bin_counts(X, self.reference['edges'])
+        if missing_mask is not None:
+            self.missing += missing_mask.sum(axis=0)
+
+    def report(self) -> dict:
+        variance = self.m2 / self.count if self.count else np.zeros_like(self.m2)
+        ref = self.reference
+        scores = None
+        if ref is not None and self.count:
+            scores = psi(self.hist / self.count, ref['proportions'])
+
+        features = {}
+        for i, name in enumerate(self.feature_names):
+            entry = {
+                'live_mean': round(float(self.mean[i]), 6),
+                'live_std': round(float(np.sqrt(variance[i])), 6),
+            }
+            if ref is not None:
+                ref_std = float(np.sqrt(ref['var'][i]))
+                entry['reference_mean'] = round(float(ref['mean'][i]), 6)
+                entry['reference_std'] = round(ref_std, 6)
+                entry['mean_shift_std'] = (
+                    round(float((self.mean[i] - ref['mean'][i]) / ref_std), 4) if ref_std > 0 else None
+                )
+            if scores is not None:
+                entry['psi'] = round(float(scores[i]), 4)
+                entry['status'] = _status(scores[i])
+            features[name] = entry
+
+        enough = self.count >= DRIFT_MIN_SAMPLES
+        drifted = [
+            name for name, entry in features.items()
+            if entry.get('status') == 'significant'
+        ] if enough else []
+
+        return {
+            'samples': self.count,
+            'since': self.started_at,
+            'has_reference': ref is not None,
+            'enough_samples': enough,
+            'drift_detected': bool(drifted),
+            'drifted_features': drifted,
+            'max_psi': round(float(scores.max()), 4) if scores is not None and len(scores) else None,
+            'defaulted_indicators': {
+                name: round(float(self.missing[i] / self.count), 4) if self.count else 0.0
+                for i, name in enumerate(_TRACKED_INDICATORS)
+            },
+            'features': features,
+        }
+
+
+class DriftMonitor:
+    """
+    One FeatureStream per (symbol, timeframe), re-based whenever the
+    served model (and so its reference stats) changes
+    """
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+        self._streams = {}  # key -> (trained_at, FeatureStream)
+        self._lock = threading.Lock()
+
+    def observe(self, symbol, timeframe, feature_matrix, feature_names, indicators=None):
+        """
+        Record live rows. `feature_matrix` columns follow `feature_names`;
+        `indicators` is the raw (n, len(INDICATOR_FIELDS)) input with NaN for
+        values the caller did not send.
+        """
+        try:
+            if symbol is None or timeframe is None:
+                symbol, timeframe = self.predictor.default_key
+            metadata = self.predictor.metadata_for(symbol, timeframe) or {}
+            X = np.asarray(feature_matrix, dtype=np.float64)
+            missing = None
+            if indicators is not None:
+                tracked = [INDICATOR_FIELDS.index(name) for name in _TRACKED_INDICATORS]
+                missing = np.isnan(np.asarray(indicators, dtype=np.float64)[:, tracked])
+
+            with self._lock:
+                stream = self._stream(symbol, timeframe, metadata, feature_names)
+                if stream.feature_names != list(feature_names):
+                    positions = {name: i for i, name in enumerate(feature_names)}
+                    X = X[:, [positions[name] for name in stream.feature_names]]
+                stream.update(X, missing)
+        except Exception as e:
+            # Monitoring must never fail a prediction
+            logger.warning(f"Drift observation failed: {str(e)}")
+
+    def _stream(self, symbol, timeframe, metadata, feature_names):
+        key = (symbol, timeframe)
+        version = metadata.get('trained_at')
+        current = self._streams.get(key)
+        if current is None or current[0] != version:
+            reference = metadata.get('reference_stats')
+            names = reference['feature_names'] if reference else list(feature_names)
+            if reference and not set(names).issubset(feature_names):
+                reference, names = None, list(feature_names)
+            current = (version, FeatureStream(names, reference))
+            self._streams[key] = current
+        return current[1]
+
+    def report(self, symbol, timeframe) -> dict:
+        with self._lock:
+            current = self._streams.get((symbol, timeframe))
+            if current is None:
+                return {'symbol': symbol, 'timeframe': timeframe, 'samples': 0, 'drift_detected': False}
+            report = current[1].report()
+        report.update({'symbol': symbol, 'timeframe': timeframe, 'model_trained_at': current[0]})
+        return report
+
+    def reset(self, symbol=None, timeframe=None):
+        with self._lock:
+            if symbol is None:
+                self._streams.clear()
+            else:
+                self._streams.pop((symbol, timeframe), None)
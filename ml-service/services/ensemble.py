@@ -0,0 +1,245 @@
+"""
+Ensemble direction model: N member models saved in one artifact.
+
+EnsembleModel exposes the sklearn interface the Predictor already uses
+(predict_proba / predict / n_features_in_), so an ensemble artifact is
+served exactly like a single XGBoost model. Members score the same
+feature matrix concurrently on a shared thread pool (XGBoost and the BLAS
+calls behind the linear model release the GIL), so ensemble latency tracks
+the slowest member rather than the sum. The cores are split between the
+XGBoost members so concurrent members do not oversubscribe the CPU, and
+small batches (below ENSEMBLE_PARALLEL_MIN_ROWS) run serially because
+thread hand-off would cost more than the prediction itself.
+
+Aggregation:
+    weighted - weighted average of member class probabilities
+    stacked  - multinomial logistic regression over the concatenated member
+               probabilities, fitted on a blend split the members never saw
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+from services.model_trainer import XGB_PARAMS, calibration_split
+from utils.admission import run_blocking
+from utils.candle_store import load_history
+from utils.profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+ENSEMBLE_THREADS = int(os.getenv('ENSEMBLE_THREADS', '0')) or min(4, os.cpu_count() or 1)
+ENSEMBLE_PARALLEL_MIN_ROWS = int(os.getenv('ENSEMBLE_PARALLEL_MIN_ROWS', '64'))
+
+# Member name -> label horizon (candles ahead) and estimator factory
+MEMBER_SPECS = {
+    'xgb': {'horizon': 5, 'build': lambda: XGBClassifier(**XGB_PARAMS)},
+    'xgb_short': {'horizon': 2, 'build': lambda: XGBClassifier(**XGB_PARAMS)},
+    'xgb_long': {'horizon': 15, 'build': lambda: XGBClassifier(**XGB_PARAMS)},
+    'linear': {
+        'horizon': 5,
+        'build': lambda: make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    },
+}
+DEFAULT_MEMBERS = ['xgb', 'xgb_long', 'linear']
+# Horizon the ensemble itself is evaluated and calibrated on
+TARGET_HORIZON = 5
+
+_executor = None
+_executor_pid = None
+
+
+def _get_executor():
+    # Threads do not survive fork (gunicorn preload): one pool per process
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=ENSEMBLE_THREADS, thread_name_prefix='ensemble')
+        _executor_pid = os.getpid()
+    return _executor
+
+
+class EnsembleModel:
+    """
+    Members share one feature matrix; see module docstring for aggregation
+    """
+
+    def __init__(self, members, aggregation='weighted', weights=None, meta_model=None):
+        self.members = members  # [{'name', 'horizon', 'model'}]
+        self.aggregation = aggregation
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        self.meta_model = meta_model
+        self.n_features_in_ = members[0]['model'].n_features_in_
+        self.classes_ = np.arange(3)
+        self._split_threads()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Thread counts depend on the host that loads the artifact
+        self._split_threads()
+
+    def _parallel(self):
+        return len(self.members) > 1 and ENSEMBLE_THREADS > 1
+
+    def _split_threads(self):
+        if not self._parallel():
+            return
+        n_jobs = max(1, (os.cpu_count() or 1) // min(len(self.members), ENSEMBLE_THREADS))
+        for m in self.members:
+            if isinstance(m['model'], XGBClassifier):
+                m['model'].set_params(n_jobs=n_jobs)
+
+    def member_probabilities(self, X):
+        """predict_proba of every member, evaluated in parallel."""
+        if not self._parallel() or len(X) < ENSEMBLE_PARALLEL_MIN_ROWS:
+            return [m['model'].predict_proba(X) for m in self.members]
+        return list(_get_executor().map(lambda m: m['model'].predict_proba(X), self.members))
+
+    def aggregate(self, member_probs):
+        if self.aggregation == 'stacked':
+            return self.meta_model.predict_proba(np.hstack(member_probs))
+        return np.tensordot(self.weights, np.stack(member_probs), axes=1)
+
+    def predict_proba(self, X):
+        return self.aggregate(self.member_probabilities(X))
+
+    def predict(self, X):
+        return np.argmax(self.predict_proba(X), axis=1)
+
+    def describe(self):
+        described = []
+        for i, m in enumerate(self.members):
+            weight = None if self.weights is None else round(float(self.weights[i]), 4)
+            described.append({'name': m['name'], 'horizon': m['horizon'], 'weight': weight})
+        return described
+
+
+def fit_ensemble(features, labels, member_names, aggregation='weighted', weights=None):
+    """
+    Fit members on the first 75% of the training rows and the aggregation
+    (blend weights or stacker) on the remaining 25%, chronologically.
+    `labels` maps horizon -> remapped labels aligned with `features`.
+    """
+    blend_idx = int(len(features) * 0.75)
+    X_fit, X_blend = features[:blend_idx], features[blend_idx:]
+    y_blend = labels[TARGET_HORIZON][blend_idx:]
+
+    members = []
+    for name in member_names:
+        spec = MEMBER_SPECS[name]
+        model = spec['build']()
+        with profile_stage(f'fit_{name}'):
+            model.fit(X_fit, labels[spec['horizon']][:blend_idx])
+        members.append({'name': name, 'horizon': spec['horizon'], 'model': model})
+
+    ensemble = EnsembleModel(members, aggregation=aggregation)
+    member_probs = ensemble.member_probabilities(X_blend)
+
+    with profile_stage('fit_aggregation'):
+        if aggregation == 'stacked':
+            ensemble.meta_model = LogisticRegression(max_iter=1000).fit(np.hstack(member_probs), y_blend)
+        elif weights is not None:
+            ensemble.weights = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+        else:
+            # Inverse blend-split log loss: better-calibrated members count more
+            losses = np.array([log_loss(y_blend, p, labels=[0, 1, 2]) for p in member_probs])
+            inverse = 1.0 / np.maximum(losses, 1e-6)
+            ensemble.weights = inverse / inverse.sum()
+
+    return ensemble
+
+
+class EnsembleTrainer:
+    """
+    Train an ensemble artifact; served by the Predictor like any other model
+    """
+
+    def __init__(self, model_trainer, predictor):
+        self.model_trainer = model_trainer
+        self.predictor = predictor
+
+    async def train(self, symbol='ETHUSDT', timeframe='1h', lookback_periods=500,
+                    members=None, aggregation='weighted', weights=None, start=None, end=None):
+        """
+        Train on the latest lookback_periods rows, or on the [start, end)
+        epoch-ms range from the model trainer's candle store.
+        """
+        members = list(members or DEFAULT_MEMBERS)
+        unknown = [m for m in members if m not in MEMBER_SPECS]
+        if unknown:
+            raise ValueError(f"Unknown ensemble members: {unknown}. Available: {sorted(MEMBER_SPECS)}")
+        if weights is not None and (len(weights) != len(members) or min(weights) < 0 or sum(weights) <= 0):
+            raise ValueError("weights must be non-negative, one per member, and not all zero")
+
+        logger.info(f"Training {aggregation} ensemble {members} for {symbol} {timeframe}")
+
+        with profile_stage('fetch_data'):
+            df = await load_history(
+                self.model_trainer.candle_store, symbol, timeframe, lookback_periods, start, end
+            )
+
+        result = await run_blocking(self.train_frame, df, symbol, timeframe, members, aggregation, weights)
+        self.predictor.publish(symbol, timeframe)
+        return result
+
+    def train_frame(self, df, symbol, timeframe, members, aggregation='weighted', weights=None):
+        """
+        Fit, evaluate, calibrate and save the ensemble (blocking)
+        """
+        horizons = sorted({MEMBER_SPECS[m]['horizon'] for m in members} | {TARGET_HORIZON})
+        features, labels = self.model_trainer.features_and_labels(df, horizons=horizons)
+
+        # Same chronological 80/20 split as single-model training
+        split_idx = int(len(features) * 0.8)
+        X_train, X_test = features[:split_idx], features[split_idx:]
+        y_test = labels[TARGET_HORIZON][split_idx:]
+        # Members and aggregation never see the calibration tail of the training split
+        cal_idx = calibration_split(split_idx)
+        X_train, X_cal = X_train[:cal_idx], X_train[cal_idx:]
+        y_cal = labels[TARGET_HORIZON][cal_idx:split_idx]
+
+        ensemble = fit_ensemble(
+            X_train, {h: l[:cal_idx] for h, l in labels.items()},
+            members, aggregation=aggregation, weights=weights
+        )
+
+        with profile_stage('evaluate'):
+            member_probs = ensemble.member_probabilities(X_test)
+            y_pred = np.argmax(ensemble.aggregate(member_probs), axis=1)
+            accuracy = accuracy_score(y_test, y_pred)
+            member_accuracy = {
+                m['name']: float(accuracy_score(y_test, np.argmax(p, axis=1)))
+                for m, p in zip(ensemble.members, member_probs)
+            }
+
+        logger.info(f"Ensemble accuracy: {accuracy:.4f} (members: {member_accuracy})")
+
+        calibration = self.model_trainer.calibrate(ensemble, X_cal, y_cal)
+
+        with profile_stage('save'):
+            model_filepath = self.model_trainer.save_model(
+                ensemble, symbol, timeframe, accuracy,
+                calibration=calibration, model_type='ensemble',
+                reference_stats=self.model_trainer.reference_stats(X_train),
+                global_importance=self.model_trainer.global_importance(ensemble, X_train)
+            )
+
+        return {
+            'success': True,
+            'model_path': model_filepath,
+            'members': ensemble.describe(),
+            'aggregation': aggregation,
+            'metrics': {
+                'accuracy': float(accuracy),
+                'member_accuracy': member_accuracy,
+                'training_samples': len(X_train),
+                'calibration_samples': len(X_cal),
+                'test_samples': len(X_test),
+                'confidence_thresholds': calibration['thresholds']
+            }
+        }
@@ -0,0 +1,184 @@
+"""
+Per-prediction feature contributions for the direction model.
+
+XGBoost computes exact TreeSHAP values natively (Booster.predict with
+pred_contribs=True); approximate=True switches to the much cheaper
+Saabas path attribution. Contributions are in log-odds (margin) space for
+the predicted class: bias + sum(contributions) = that class's margin.
+
+Weighted ensembles are explained as the weight-averaged contributions of
+their members (linear members contribute coef * standardised value). This
+is an attribution of the averaged margins, not an exact decomposition of
+the averaged probabilities. Stacked ensembles and the untrained fallback
+model cannot be explained.
+
+Explanations are cached per (model version, feature vector) in an LRU, so
+explaining a prediction that was already explained (e.g. every signal for
+the same candle) is a dict lookup.
+"""
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import xgboost as xgb
+from xgboost import XGBClassifier
+
+from services.calibration import apply_calibration
+from services.predictor import align_features
+from utils.dtypes import as_features
+from utils.metrics import EXPLAIN_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_CACHE_SIZE = int(os.getenv('EXPLAIN_CACHE_SIZE', '4096'))
+# Rows used for global importance at training time
+GLOBAL_IMPORTANCE_SAMPLE = 2000
+
+_DIRECTIONS = ['down', 'neutral', 'up']
+
+
+def member_contributions(model, X, approximate=False):
+    """(n, classes, features + 1) margin contributions; the last column is the bias."""
+    if isinstance(model, XGBClassifier):
+        return model.get_booster().predict(
+            xgb.DMatrix(X), pred_contribs=True, approx_contribs=approximate
+        )
+
+    steps = getattr(model, 'named_steps', None)
+    if steps is not None:
+        scaler, linear = model.steps[0][1], model.steps[-1][1]
+        if hasattr(scaler, 'transform') and hasattr(linear, 'coef_'):
+            z = scaler.transform(X)
+            contributions = z[:, None, :] * linear.coef_[None, :, :]
+            bias = np.broadcast_to(linear.intercept_[None, :, None], (len(X), len(linear.intercept_), 1))
+            return np.concatenate([contributions, bias], axis=2)
+
+    raise ValueError(f"Explanations are not supported for {type(model).__name__} models")
+
+
+def tree_contributions(model, X, approximate=False):
+    """Contributions for a served model (single XGBoost or weighted ensemble)."""
+    members = getattr(model, 'members', None)
+    if members is None:
+        return member_contributions(model, X, approximate)
+    if model.aggregation != 'weighted':
+        raise ValueError(f"Explanations are not supported for {model.aggregation} ensembles")
+    total = None
+    for member, weight in zip(members, model.weights):
+        part = weight * member_contributions(member['model'], X, approximate)
+        total = part if total is None else total + part
+    return total
+
+
+def compute_global_importance(model, X, feature_names):
+    """
+    Mean |contribution| per feature over (a sample of) the training rows,
+    sorted high to low. None when the model type cannot be explained.
+    """
+    X = as_features(X)
+    if len(X) > GLOBAL_IMPORTANCE_SAMPLE:
+        X = X[np.linspace(0, len(X) - 1, GLOBAL_IMPORTANCE_SAMPLE).astype(int)]
+    try:
+        contributions = tree_contributions(model, X, approximate=True)
+    except ValueError:
+        return None
+    importance = np.abs(contributions[:, :, :-1]).mean(axis=(0, 1))
+    order = np.argsort(-importance)
+    return {feature_names[i]: round(float(importance[i]), 6) for i in order}
+
+
+class Explainer:
+    """
+    Explains predictions of whichever model the Predictor serves for a symbol/timeframe
+    """
+
+    def __init__(self, predictor, cache_size=EXPLAIN_CACHE_SIZE):
+        self.predictor = predictor
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def explain_batch(self, feature_matrix, feature_names, symbol=None, timeframe=None,
+                      approximate=False, top_k=5):
+        """
+        One explanation per row of `feature_matrix` (columns follow `feature_names`).
+        """
+        model, metadata = self.predictor.resolve(symbol, timeframe)
+        if model is None or metadata.get('trained_at') == 'fallback':
+            raise ValueError("No trained model to explain; train one first")
+
+        X = align_features(as_features(feature_matrix), feature_names, model, metadata)
+        names = list(metadata.get('feature_names') or feature_names)
+        version = (metadata.get('symbol'), metadata.get('timeframe'), metadata.get('trained_at'), approximate)
+
+        keys = [(version, row.tobytes()) for row in X]
+        results = [None] * len(X)
+        misses = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    misses.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    results[i] = cached
+        EXPLAIN_CACHE_LOOKUPS.inc(len(X) - len(misses), result='hit')
+
+        if misses:
+            EXPLAIN_CACHE_LOOKUPS.inc(len(misses), result='miss')
+            X_miss = X[misses]
+            contributions = tree_contributions(model, X_miss, approximate)
+            probabilities = model.predict_proba(X_miss)
+            calibrated = apply_calibration(metadata.get('calibration'), probabilities)
+            classes = np.argmax(probabilities, axis=1)
+
+            with self._lock:
+                for j, i in enumerate(misses):
+                    row = contributions[j, classes[j]]
+                    entry = {
+                        'direction': _DIRECTIONS[classes[j]],
+                        'probability': round(float(calibrated[j]), 4),
+                        'bias': float(row[-1]),
+                        'values': X_miss[j],
+                        'contributions': row[:-1],
+                    }
+                    results[i] = entry
+                    self._cache[keys[i]] = entry
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [self._render(entry, names, top_k) for entry in results]
+
+    @staticmethod
+    def _render(entry, names, top_k):
+        contributions = entry['contributions']
+        order = np.argsort(-np.abs(contributions))[:top_k]
+        return {
+            'direction': entry['direction'],
+            'probability': entry['probability'],
+            'bias': round(entry['bias'], 6),
+            'contributions': {name: round(float(c), 6) for name, c in zip(names, contributions)},
+            'top_features': [
+                {
+                    'feature': names[i],
+                    'value': round(float(entry['values'][i]), 6),
+                    'contribution': round(float(contributions[i]), 6),
+                }
+                for i in order
+            ],
+        }
+
+    def global_importance(self, symbol=None, timeframe=None):
+        metadata = self.predictor.metadata_for(symbol, timeframe) or {}
+        return {
+            'symbol': metadata.get('symbol'),
+            'timeframe': metadata.get('timeframe'),
+            'trained_at': metadata.get('trained_at'),
+            'importance': metadata.get('global_importance'),
+        }
+
+    def cache_info(self):
+        with self._lock:
+            return {'size': len(self._cache), 'max_size': self.cache_size}
@@ -1,16 +1,38 @@
 import numpy as np
+from datetime import datetime, timezone
 from typing import Dict, Any
 import logging
 
+from services.sentiment_features import SENTIMENT_FEATURE_NAMES
+from utils.dtypes import FEATURE_DTYPE
+
 logger = logging.getLogger(__name__)
 
+# Fixed column order for batched/binary inputs (same keys as the /predict dict)
+INDICATOR_FIELDS = [
+    'rsi', 'macd', 'macdSignal', 'ema9', 'ema21', 'ema50', 'ema200',
+    'vwap', 'atr', 'adx', 'bbWidth', 'close', 'timestamp',
+]
+
+_INDICATOR_DEFAULTS = {'rsi': 50.0, 'adx': 25.0, 'bbWidth': 4.0}
+
+# INDICATOR_FIELDS key -> column name in training/history DataFrames
+DATAFRAME_COLUMNS = {
+    'rsi': 'rsi', 'macd': 'macd', 'macdSignal': 'macd_signal', 'ema9': 'ema9',
+    'ema21': 'ema21', 'ema50': 'ema50', 'ema200': 'ema200', 'vwap': 'vwap',
+    'atr': 'atr', 'adx': 'adx', 'bbWidth': 'bb_width', 'close': 'close',
+    'timestamp': 'timestamp',
+}
+
 
 class FeatureEngineer:
     """
     Feature engineering for trading ML models
     """
 
-    def __init__(self):
+    def __init__(self, sentiment_index=None):
+        # Optional SentimentFeatureIndex; without one sentiment features are neutral zeros
+        self.sentiment_index = sentiment_index
         self.feature_names = [
             'rsi',
             'rsi_normalized',
@@ -32,12 +54,16 @@ class FeatureEngineer:
             'adx',                  # ADX trend strength (0-100); <20 = ranging, >25 = trending
             'price_to_ema200',      # Price / EMA200 — macro trend position
             'bb_width',             # BB width % — volatility/squeeze indicator
+            # --- Sentiment features (rolling 24h window of collected posts) ---
+            *SENTIMENT_FEATURE_NAMES,  # mean label, confidence-weighted label, post volume
         ]
 
     def prepare_features_for_prediction(self, indicators: Dict[str, float]) -> Dict[str, Any]:
         """
         Prepare features from indicators for prediction.
         Expects 'close' (current price) in indicators dict; falls back to vwap.
+        Sentiment features come from 'sentimentMean'/'sentimentWeighted'/'sentimentVolume'
+        when supplied, otherwise from the sentiment index at 'timestamp' (ms, default now).
         """
         try:
             rsi = indicators.get('rsi', 50.0)
@@ -74,6 +100,8 @@ class FeatureEngineer:
 
             price_to_ema200 = (price / ema200) if price and ema200 and ema200 != 0 else 1.0
 
+            sentiment = self._sentiment_features(indicators)
+
             features = {
                 'rsi': rsi,
                 'rsi_normalized': rsi_normalized,
@@ -94,43 +122,132 @@ class FeatureEngineer:
                 'adx': float(adx) if adx is not None else 25.0,
                 'price_to_ema200': price_to_ema200,
                 'bb_width': float(bb_width) if bb_width is not None else 4.0,
+                **sentiment,
             }
 
-            logger.info(f"Engineered {len(features)} features")
+            logger.debug(f"Engineered {len(features)} features")
             return features
 
         except Exception as e:
             logger.error(f"Feature engineering error: {str(e)}")
             raise
 
+    def prepare_feature_matrix(self, indicators: np.ndarray, sentiment: np.ndarray = None) -> np.ndarray:
+        """
+        Vectorized prepare_features_for_prediction for a batch.
+        `indicators` is (n, k) in INDICATOR_FIELDS order (k may stop short of
+        'timestamp'); NaN marks a missing value and gets the same default as a
+        missing dict key. `sentiment` (n, 3) overrides the index lookup.
+        Arithmetic is float64; returns a C-contiguous (n, len(feature_names))
+        FEATURE_DTYPE matrix.
+        """
+        indicators = np.asarray(indicators, dtype=np.float64)
+        n = indicators.shape[0]
+
+        def col(name):
+            i = INDICATOR_FIELDS.index(name)
+            values = indicators[:, i] if i < indicators.shape[1] else np.full(n, np.nan)
+            return np.where(np.isnan(values), _INDICATOR_DEFAULTS.get(name, 0.0), values)
+
+        def ratio(num, den, default):
+            # Mirrors `num / den if num and den and den != 0 else default`
+            ok = (num != 0) & (den != 0)
+            return np.where(ok, num / np.where(ok, den, 1.0), default)
+
+        rsi, macd, macd_signal = col('rsi'), col('macd'), col('macdSignal')
+        ema9, ema21, ema50, ema200 = col('ema9'), col('ema21'), col('ema50'), col('ema200')
+        vwap, atr, adx, bb_width = col('vwap'), col('atr'), col('adx'), col('bbWidth')
+        close = col('close')
+        price = np.where(close != 0, close, vwap)
+
+        macd_histogram = np.where((macd != 0) & (macd_signal != 0), macd - macd_signal, 0.0)
+        rsi_normalized = np.where(rsi != 0, (rsi - 50) / 50, 0.0)
+        ema_short_long_ratio = ratio(ema9, ema50, 1.0)
+        all_emas = (ema9 != 0) & (ema21 != 0) & (ema50 != 0)
+        ema_trend_strength = np.where(all_emas, ((ema9 - ema50) / np.where(all_emas, ema50, 1.0)) * 100, 0.0)
+
+        avg_price = np.where((ema9 != 0) & (ema21 != 0), (ema9 + ema21) / 2,
+                             np.where(price != 0, price, 1.0))
+        atr_normalized = np.where((atr != 0) & (avg_price != 0),
+                                  atr / np.where(avg_price != 0, avg_price, 1.0) * 100, 0.0)
+
+        if sentiment is not None:
+            sentiment = np.asarray(sentiment)
+        elif self.sentiment_index is not None:
+            ts = indicators[:, INDICATOR_FIELDS.index('timestamp')] \
+                if indicators.shape[1] > INDICATOR_FIELDS.index('timestamp') else np.full(n, np.nan)
+            now_ms = datetime.now(timezone.utc).timestamp() * 1000
+            sentiment = self.sentiment_index.features_at(np.where(np.isnan(ts), now_ms, ts))
+        else:
+            sentiment = np.zeros((n, len(SENTIMENT_FEATURE_NAMES)))
+
+        columns = [
+            rsi, rsi_normalized, macd, macd_signal, macd_histogram,
+            ema9, ema21, ema50, ema_short_long_ratio, ema_trend_strength,
+            vwap, atr, atr_normalized,
+            ratio(price, ema9, 1.0), ratio(price, ema21, 1.0), ratio(price, vwap, 1.0),
+            adx, ratio(price, ema200, 1.0), bb_width,
+        ]
+        # Written straight into the output buffer instead of column_stack + astype
+        out = np.empty((n, len(self.feature_names)), dtype=FEATURE_DTYPE)
+        for j, values in enumerate(columns):
+            out[:, j] = values
+        out[:, len(columns):] = sentiment
+        return out
+
+    @staticmethod
+    def dataframe_to_indicators(df) -> np.ndarray:
+        """
+        (n, len(INDICATOR_FIELDS)) matrix for prepare_feature_matrix from a
+        history DataFrame; absent columns are NaN (i.e. defaulted). float64
+        because it carries epoch-ms timestamps.
+        """
+        matrix = np.full((len(df), len(INDICATOR_FIELDS)), np.nan)
+        for i, name in enumerate(INDICATOR_FIELDS):
+            column = DATAFRAME_COLUMNS[name]
+            if column in df:
+                matrix[:, i] = df[column].to_numpy(dtype=np.float64)
+        return matrix
+
+    def _sentiment_features(self, indicators: Dict[str, float]) -> Dict[str, float]:
+        if 'sentimentMean' in indicators:
+            return {
+                'sentiment_mean': float(indicators.get('sentimentMean') or 0.0),
+                'sentiment_weighted': float(indicators.get('sentimentWeighted') or 0.0),
+                'sentiment_volume': float(indicators.get('sentimentVolume') or 0.0),
+            }
+        if self.sentiment_index is None:
+            return dict.fromkeys(SENTIMENT_FEATURE_NAMES, 0.0)
+        return self.sentiment_index.features_for(indicators.get('timestamp'))
+
+    def add_sentiment_features(self, df):
+        """
+        Add rolling sentiment columns to an OHLCV DataFrame, aligned to each
+        candle's 'timestamp' (epoch ms) with a single vectorized as-of lookup.
+        """
+        df = df.copy()
+        if self.sentiment_index is not None and 'timestamp' in df:
+            values = self.sentiment_index.features_at(df['timestamp'].to_numpy())
+        else:
+            values = np.zeros((len(df), len(SENTIMENT_FEATURE_NAMES)))
+        for i, name in enumerate(SENTIMENT_FEATURE_NAMES):
+            df[name] = values[:, i]
+        return df
+
     def extract_features_from_dataframe(self, df):
         """
         Extract features from a pandas DataFrame with OHLCV and indicators.
         'close' column is passed so price_to_ema / price_to_vwap use real price.
+        Precomputed sentiment_* columns are used when present.
         """
         try:
-            features = []
-
-            for idx, row in df.iterrows():
-                indicators = {
-                    'rsi': row.get('rsi', 50.0),
-                    'macd': row.get('macd', 0.0),
-                    'macdSignal': row.get('macd_signal', 0.0),
-                    'ema9': row.get('ema9', 0.0),
-                    'ema21': row.get('ema21', 0.0),
-                    'ema50': row.get('ema50', 0.0),
-                    'ema200': row.get('ema200', 0.0),
-                    'vwap': row.get('vwap', 0.0),
-                    'atr': row.get('atr', 0.0),
-                    'adx': row.get('adx', 25.0),
-                    'bbWidth': row.get('bb_width', 4.0),
-                    'close': row.get('close', 0.0),  # actual close price for ratio features
-                }
-
-                feature_dict = self.prepare_features_for_prediction(indicators)
-                features.append(list(feature_dict.values()))
-
-            return np.array(features)
+            sentiment = None
+            if set(SENTIMENT_FEATURE_NAMES).issubset(df.columns):
+                sentiment = df[SENTIMENT_FEATURE_NAMES].to_numpy(dtype=np.float64)
+            elif self.sentiment_index is None or 'timestamp' not in df:
+                sentiment = np.zeros((len(df), len(SENTIMENT_FEATURE_NAMES)))
+
+            return self.prepare_feature_matrix(self.dataframe_to_indicators(df), sentiment=sentiment)
 
         except Exception as e:
             logger.error(f"DataFrame feature extraction error: {str(e)}")
@@ -148,24 +265,16 @@ class FeatureEngineer:
         Do NOT pad the trailing rows with neutral — that injects false labels.
         """
         try:
-            labels = []
-
-            for i in range(len(df) - look_ahead):
-                current_price = df.iloc[i]['close']
-                future_price = df.iloc[i + look_ahead]['close']
-
-                price_change = (future_price - current_price) / current_price
+            close = df['close'].to_numpy(dtype=np.float64)
+            n = max(len(close) - look_ahead, 0)
+            current_price, future_price = close[:n], close[look_ahead:look_ahead + n]
 
-                if price_change > threshold:
-                    labels.append(1)
-                elif price_change < -threshold:
-                    labels.append(-1)
-                else:
-                    labels.append(0)
+            price_change = (future_price - current_price) / current_price
+            labels = np.where(price_change > threshold, 1, np.where(price_change < -threshold, -1, 0))
 
             # Return exactly (len(df) - look_ahead) labels.
             # model_trainer aligns features[:min_len] to labels[:min_len].
-            return np.array(labels)
+            return labels.astype(np.int8)
 
         except Exception as e:
             logger.error(f"Label creation error: {str(e)}")
@@ -1,5 +1,6 @@
 import os
 import joblib
+import warnings
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -7,112 +8,358 @@ from sklearn.metrics import accuracy_score, classification_report
 from xgboost import XGBClassifier
 import logging
 
+from services.calibration import fit_calibration
+from services.drift import compute_reference_stats
+from services.explainer import compute_global_importance
 from services.feature_engineering import FeatureEngineer
-from utils.database import get_training_data
+from utils.admission import run_blocking
+from utils.artifacts import atomic_dump
+from utils.candle_store import load_history
+from utils.metrics import FEATURE_ENGINEERING_SECONDS, TRAINING_RUNS
+from utils.profiling import profile_stage
 
 logger = logging.getLogger(__name__)
 
+XGB_PARAMS = dict(
+    n_estimators=100,
+    max_depth=5,
+    learning_rate=0.1,
+    objective='multi:softprob',
+    num_class=3,
+    random_state=42,
+    eval_metric='mlogloss'
+)
+
+# Warm-start retraining: trees added per incremental run, cap on total
+# boosting rounds before a full retrain is forced, and how much accuracy
+# (on the current test split) a warm-started model may lose vs. the model
+# it started from before we fall back to a full retrain.
+INCREMENTAL_EXTRA_TREES = int(os.getenv('INCREMENTAL_EXTRA_TREES', '20'))
+INCREMENTAL_MAX_TREES = int(os.getenv('INCREMENTAL_MAX_TREES', '300'))
+INCREMENTAL_TOLERANCE = float(os.getenv('INCREMENTAL_TOLERANCE', '0.02'))
+# Fewest candles newer than the base model's training data worth boosting on
+INCREMENTAL_MIN_ROWS = int(os.getenv('INCREMENTAL_MIN_ROWS', '20'))
+# Chronologically last share of the training split held back from fitting to
+# fit calibration and confidence thresholds on, so the test split that
+# accuracy is reported on stays untouched by anything that was fitted
+CALIBRATION_FRACTION = float(os.getenv('CALIBRATION_FRACTION', '0.2'))
+
+
+def calibration_split(n_rows):
+    """
+    Index splitting n_rows training rows into (fit rows, calibration rows)
+    """
+    return n_rows - int(n_rows * CALIBRATION_FRACTION)
+
+
+def fit_and_evaluate(X_train, y_train, X_test, y_test, n_jobs=None):
+    """
+    Fit an XGBoost direction model and score it on the held-out split.
+    Top-level (picklable) so the batch orchestrator can run it in worker processes.
+    """
+    params = dict(XGB_PARAMS)
+    if n_jobs is not None:
+        params['n_jobs'] = n_jobs
+    model = XGBClassifier(**params)
+
+    with profile_stage('fit'):
+        model.fit(X_train, y_train)
+
+    with profile_stage('evaluate'):
+        y_pred = model.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
+
+    return model, accuracy, y_pred
+
+
+def fit_warm_start(base_model, X_train, y_train, X_test, y_test, mode='incremental',
+                   extra_trees=INCREMENTAL_EXTRA_TREES):
+    """
+    Continue from base_model's booster instead of fitting from scratch.
+    'incremental' boosts up to extra_trees more rounds on X_train (the caller
+    passes only candles the base model has not seen); 'refresh' re-fits the
+    leaf values of the existing trees on X_train without adding any.
+    base_model itself is left untouched.
+    """
+    booster = base_model.get_booster()
+    params = dict(XGB_PARAMS)
+    if mode == 'refresh':
+        params.update(
+            n_estimators=booster.num_boosted_rounds(),
+            process_type='update',
+            updater='refresh',
+            refresh_leaf=True,
+            # refresh needs a plain DMatrix; 'hist' would build a QuantileDMatrix
+            tree_method='approx'
+        )
+    else:
+        params['n_estimators'] = extra_trees
+    model = XGBClassifier(**params)
+
+    with profile_stage('fit'), warnings.catch_warnings():
+        # XGBoost warns whenever `updater` is set explicitly
+        warnings.filterwarnings('ignore', message='.*updater.*', category=UserWarning)
+        model.fit(X_train, y_train, xgb_model=booster)
+
+    if mode == 'refresh':
+        # Drop the refresh-only training config from the booster so the next
+        # warm start (or the saved artifact) behaves like a normally trained model
+        refreshed = XGBClassifier(**XGB_PARAMS)
+        refreshed.load_model(bytearray(model.get_booster().save_raw('ubj')))
+        model = refreshed
+
+    with profile_stage('evaluate'):
+        y_pred = model.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
+
+    return model, accuracy, y_pred
+
 
 class ModelTrainer:
     """
     Train ML models for price direction prediction
     """
 
-    def __init__(self):
-        self.feature_engineer = FeatureEngineer()
+    def __init__(self, sentiment_index=None, candle_store=None):
+        self.feature_engineer = FeatureEngineer(sentiment_index=sentiment_index)
+        # Optional CandleStore serving start/end ranges without a database query
+        self.candle_store = candle_store
         self.model_path = os.getenv('MODEL_PATH', './models')
         os.makedirs(self.model_path, exist_ok=True)
 
-    async def train_model(self, symbol='ETHUSDT', timeframe='1h', lookback_periods=500):
+    async def train_model(self, symbol='ETHUSDT', timeframe='1h', lookback_periods=500, mode='full',
+                          start=None, end=None):
         """
-        Train a new model on historical data
+        Train a new model on historical data: the latest lookback_periods rows,
+        or the [start, end) epoch-ms range from the candle store.
+        mode 'incremental' / 'refresh' warm-start from latest_model_* and fall
+        back to a full retrain when that is not possible or loses accuracy.
         """
         try:
             logger.info(f"Starting model training for {symbol} {timeframe}")
 
-            df = await get_training_data(symbol, timeframe, lookback_periods)
+            with profile_stage('fetch_data'):
+                df = await load_history(self.candle_store, symbol, timeframe, lookback_periods, start, end)
 
-            if df is None or len(df) < 100:
-                raise ValueError("Insufficient training data")
+            # Fitting is seconds of CPU; keep it off the event loop serving /predict
+            return await run_blocking(self.train_frame, df, symbol, timeframe, mode)
 
-            logger.info(f"Retrieved {len(df)} rows of training data")
+        except Exception as e:
+            logger.error(f"Model training failed: {str(e)}")
+            raise
 
-            features = self.feature_engineer.extract_features_from_dataframe(df)
-            labels = self.feature_engineer.create_labels(df, look_ahead=5, threshold=0.005)
-
-            min_len = min(len(features), len(labels))
-            features = features[:min_len]
-            labels = labels[:min_len]
-
-            # XGBoost multi:softprob requires classes [0, 1, 2]
-            # Remap: -1 (down) → 0, 0 (neutral) → 1, 1 (up) → 2
-            label_remap = {-1: 0, 0: 1, 1: 2}
-            labels = np.array([label_remap[int(l)] for l in labels])
-
-            if len(features) < 100:
-                raise ValueError("Not enough valid feature samples")
-
-            # Chronological split — never shuffle time-series data.
-            # Random split leaks future data into training set, inflating accuracy.
-            split_idx = int(len(features) * 0.8)
-            X_train, X_test = features[:split_idx], features[split_idx:]
-            y_train, y_test = labels[:split_idx], labels[split_idx:]
-
-            logger.info(f"Training set size: {len(X_train)}, Test set size: {len(X_test)}")
-
-            model = XGBClassifier(
-                n_estimators=100,
-                max_depth=5,
-                learning_rate=0.1,
-                objective='multi:softprob',
-                num_class=3,
-                random_state=42,
-                eval_metric='mlogloss'
+    def train_frame(self, df, symbol, timeframe, mode='full'):
+        """
+        Fit, calibrate and save a model for already loaded candles (blocking).
+        The tail of the training split is held back for calibration; accuracy
+        is reported on the test split, which nothing is fitted on.
+        Warm starts save boosting work only: calibration, reference stats and
+        global importance describe the updated model, so they are recomputed
+        in every mode.
+        """
+        X_train, X_test, y_train, y_test = self.prepare_dataset(df)
+        cal_idx = calibration_split(len(X_train))
+        X_train, X_cal = X_train[:cal_idx], X_train[cal_idx:]
+        y_train, y_cal = y_train[:cal_idx], y_train[cal_idx:]
+        # Features are row-aligned with df, so training row i is candle i
+        train_timestamps = df['timestamp'].to_numpy()[:len(X_train)] if 'timestamp' in df else None
+        trained_through = int(train_timestamps[-1]) if train_timestamps is not None else None
+
+        logger.info(
+            f"Training set size: {len(X_train)}, Calibration set size: {len(X_cal)}, "
+            f"Test set size: {len(X_test)}"
+        )
+
+        model, fallback_reason, fitted_rows = None, None, len(X_train)
+        if mode != 'full':
+            model, accuracy, y_pred, fitted_rows, fallback_reason = self._try_warm_start(
+                symbol, timeframe, mode, X_train, y_train, X_test, y_test, train_timestamps
+            )
+            if model is None:
+                logger.warning(f"{mode} retrain not used ({fallback_reason}), doing a full retrain")
+        mode_used = mode if model is not None else 'full'
+        if model is None:
+            model, accuracy, y_pred = fit_and_evaluate(X_train, y_train, X_test, y_test)
+            fitted_rows = len(X_train)
+        TRAINING_RUNS.inc(mode=mode_used)
+
+        logger.info(f"Model accuracy: {accuracy:.4f}")
+        logger.info(f"\n{classification_report(y_test, y_pred, labels=[0, 1, 2], target_names=['Down', 'Neutral', 'Up'], zero_division=0)}")
+
+        calibration = self.calibrate(model, X_cal, y_cal)
+
+        with profile_stage('save'):
+            model_filepath = self.save_model(
+                model, symbol, timeframe, accuracy, train_mode=mode_used, calibration=calibration,
+                reference_stats=self.reference_stats(X_train),
+                global_importance=self.global_importance(model, X_train),
+                trained_through=trained_through
             )
 
-            model.fit(X_train, y_train)
-
-            y_pred = model.predict(X_test)
-            accuracy = accuracy_score(y_test, y_pred)
-
-            logger.info(f"Model accuracy: {accuracy:.4f}")
-            logger.info(f"\n{classification_report(y_test, y_pred, target_names=['Down', 'Neutral', 'Up'])}")
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            model_filename = f"xgb_model_{symbol}_{timeframe}_{timestamp}.joblib"
-            model_filepath = os.path.join(self.model_path, model_filename)
-
-            joblib.dump({
-                'model': model,
-                'feature_names': self.feature_engineer.feature_names,
-                'symbol': symbol,
-                'timeframe': timeframe,
-                'accuracy': accuracy,
-                'trained_at': datetime.now().isoformat()
-            }, model_filepath)
-
-            latest_model_path = os.path.join(self.model_path, f"latest_model_{symbol}_{timeframe}.joblib")
-            joblib.dump({
-                'model': model,
-                'feature_names': self.feature_engineer.feature_names,
-                'symbol': symbol,
-                'timeframe': timeframe,
-                'accuracy': accuracy,
-                'trained_at': datetime.now().isoformat()
-            }, latest_model_path)
-
-            logger.info(f"Model saved to {model_filepath}")
-
-            return {
-                'success': True,
-                'model_path': model_filepath,
-                'metrics': {
-                    'accuracy': float(accuracy),
-                    'training_samples': len(X_train),
-                    'test_samples': len(X_test)
-                }
+        return {
+            'success': True,
+            'model_path': model_filepath,
+            'mode': mode_used,
+            'fallback_reason': fallback_reason,
+            'metrics': {
+                'accuracy': float(accuracy),
+                'training_samples': len(X_train),
+                'fitted_samples': fitted_rows,
+                'calibration_samples': len(X_cal),
+                'test_samples': len(X_test),
+                'boosted_rounds': model.get_booster().num_boosted_rounds(),
+                'calibration': calibration['method'],
+                'confidence_thresholds': calibration['thresholds']
             }
+        }
 
-        except Exception as e:
-            logger.error(f"Model training failed: {str(e)}")
-            raise
+    def _try_warm_start(self, symbol, timeframe, mode, X_train, y_train, X_test, y_test,
+                        train_timestamps=None):
+        """
+        Returns (model, accuracy, y_pred, fitted_rows, None), or
+        (None, None, None, None, reason) when the caller should do a full
+        retrain instead. 'incremental' boosts only on training rows newer than
+        the base model's trained_through candle.
+        """
+        latest_model_path = os.path.join(self.model_path, f"latest_model_{symbol}_{timeframe}.joblib")
+        if not os.path.exists(latest_model_path):
+            return None, None, None, None, 'no previous model'
+
+        with profile_stage('load_base_model'):
+            artifact = joblib.load(latest_model_path)
+        base_model = artifact.get('model')
+
+        if not isinstance(base_model, XGBClassifier):
+            return None, None, None, None, 'previous model is not XGBoost'
+        if list(artifact.get('feature_names') or []) != list(self.feature_engineer.feature_names):
+            return None, None, None, None, 'feature set changed'
+        rounds = base_model.get_booster().num_boosted_rounds()
+        if mode == 'incremental' and rounds + INCREMENTAL_EXTRA_TREES > INCREMENTAL_MAX_TREES:
+            return None, None, None, None, f'tree budget reached ({rounds} rounds)'
+
+        trained_through = artifact.get('trained_through')
+        if mode == 'incremental':
+            if trained_through is None or train_timestamps is None:
+                return None, None, None, None, 'previous model does not record its training range'
+            new_rows = train_timestamps > trained_through
+            if new_rows.sum() < INCREMENTAL_MIN_ROWS:
+                return None, None, None, None, f'only {int(new_rows.sum())} new candles since the previous fit'
+            X_train, y_train = X_train[new_rows], y_train[new_rows]
+
+        # Validation guard: score the previous model on today's test split
+        with profile_stage('evaluate_base'):
+            base_accuracy = accuracy_score(y_test, base_model.predict(X_test))
+
+        model, accuracy, y_pred = fit_warm_start(base_model, X_train, y_train, X_test, y_test, mode=mode)
+        logger.info(
+            f"{mode} retrain on {len(X_train)} rows: accuracy {accuracy:.4f} (previous model {base_accuracy:.4f})"
+        )
+
+        if accuracy < base_accuracy - INCREMENTAL_TOLERANCE:
+            return None, None, None, None, f'accuracy dropped from {base_accuracy:.4f} to {accuracy:.4f}'
+        return model, accuracy, y_pred, len(X_train), None
+
+    def calibrate(self, model, X_cal, y_cal):
+        """
+        Calibration table + confidence thresholds from the calibration slice
+        (rows the model was not fitted on, kept apart from the test split)
+        """
+        with profile_stage('calibrate'):
+            return fit_calibration(model.predict_proba(X_cal), y_cal)
+
+    def reference_stats(self, X_train):
+        """
+        Training-distribution summary the drift monitor compares live features against
+        """
+        with profile_stage('reference_stats'):
+            return compute_reference_stats(X_train, self.feature_engineer.feature_names)
+
+    def global_importance(self, model, X_train):
+        """
+        Mean |contribution| per feature, precomputed for /explain/global
+        """
+        with profile_stage('global_importance'):
+            return compute_global_importance(model, X_train, self.feature_engineer.feature_names)
+
+    def prepare_dataset(self, df):
+        """
+        Features + remapped labels with a chronological 80/20 split.
+        Returns (X_train, X_test, y_train, y_test).
+        """
+        features, labels = self.features_and_labels(df, horizons=(5,))
+        labels = labels[5]
+
+        # Chronological split — never shuffle time-series data.
+        # Random split leaks future data into training set, inflating accuracy.
+        split_idx = int(len(features) * 0.8)
+        X_train, X_test = features[:split_idx], features[split_idx:]
+        y_train, y_test = labels[:split_idx], labels[split_idx:]
+        return X_train, X_test, y_train, y_test
+
+    def features_and_labels(self, df, horizons=(5,)):
+        """
+        Feature matrix plus remapped labels for each look-ahead horizon, all
+        trimmed to the rows every horizon has future data for.
+        Returns (features, {horizon: labels}).
+        """
+        if df is None or len(df) < 100:
+            raise ValueError("Insufficient training data")
+
+        logger.info(f"Retrieved {len(df)} rows of training data")
+
+        with profile_stage('extract_features'), FEATURE_ENGINEERING_SECONDS.time(mode='train'):
+            features = self.feature_engineer.extract_features_from_dataframe(df)
+        with profile_stage('create_labels'):
+            raw_labels = {
+                h: self.feature_engineer.create_labels(df, look_ahead=h, threshold=0.005)
+                for h in horizons
+            }
+
+        min_len = min([len(features)] + [len(l) for l in raw_labels.values()])
+        features = features[:min_len]
+
+        # XGBoost multi:softprob requires classes [0, 1, 2]
+        # Remap: -1 (down) → 0, 0 (neutral) → 1, 1 (up) → 2
+        labels = {
+            h: raw[:min_len].astype(np.int32) + 1
+            for h, raw in raw_labels.items()
+        }
+
+        if len(features) < 100:
+            raise ValueError("Not enough valid feature samples")
+
+        return features, labels
+
+    def save_model(self, model, symbol, timeframe, accuracy, train_mode='full', calibration=None,
+                   model_type='xgboost', reference_stats=None, global_importance=None,
+                   trained_through=None):
+        """
+        Write the timestamped artifact and swap in latest_model_*; returns the timestamped path.
+        trained_through is the epoch-ms timestamp of the last training candle.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        model_filename = f"xgb_model_{symbol}_{timeframe}_{timestamp}.joblib"
+        model_filepath = os.path.join(self.model_path, model_filename)
+
+        artifact = {
+            'model': model,
+            'feature_names': self.feature_engineer.feature_names,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'accuracy': accuracy,
+            'trained_at': datetime.now().isoformat(),
+            'model_type': model_type,
+            'train_mode': train_mode,
+            'calibration': calibration,
+            'reference_stats': reference_stats,
+            'global_importance': global_importance,
+            'trained_through': trained_through
+        }
+        joblib.dump(artifact, model_filepath)
+
+        # Atomic swap: other workers may be loading latest_model_* right now
+        latest_model_path = os.path.join(self.model_path, f"latest_model_{symbol}_{timeframe}.joblib")
+        atomic_dump(artifact, latest_model_path)
+
+        logger.info(f"Model saved to {model_filepath}")
+        return model_filepath
@@ -0,0 +1,171 @@
+"""
+Long-lived WebSocket prediction channel (/ws/predict).
+
+The backend keeps one socket open and pipelines messages without waiting
+for replies:
+
+    {"type": "predict", "id": 17, "symbol": "ETHUSDT", "timeframe": "1h", "indicators": {...}}
+    {"type": "candle", "symbol": "ETHUSDT", "timeframe": "1h", "indicators": {...}, "candle_timestamp": "1700000000000"}
+
+Each gets a {"type": "prediction", ...} reply ('id' echoed for predict,
+null for candle pushes, which echo an optional 'candle_timestamp' and the
+'close' they were scored with instead, so the client can tell which candle
+and price a pushed prediction belongs to). Queued candle pushes for the same symbol/timeframe
+are coalesced to the newest one.
+
+Backpressure: the reader stops pulling from the socket once
+STREAM_MAX_INFLIGHT messages are queued, so a fast producer is slowed by TCP
+flow control instead of growing server memory. The worker drains up to
+STREAM_MAX_BATCH queued messages into one vectorized predict_batch call.
+"""
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from services.feature_engineering import INDICATOR_FIELDS
+from services.calibration import CONFIDENCE_LABELS
+
+logger = logging.getLogger(__name__)
+
+STREAM_MAX_INFLIGHT = int(os.getenv('STREAM_MAX_INFLIGHT', '256'))
+STREAM_MAX_BATCH = int(os.getenv('STREAM_MAX_BATCH', '64'))
+
+_DIRECTIONS = {-1: 'down', 0: 'neutral', 1: 'up'}
+_STOP = object()
+
+
+class PredictionStream:
+    """
+    Serves one WebSocket connection; shares the app's engineer and predictor.
+    """
+
+    def __init__(self, feature_engineer, predictor, before_batch=None, drift_monitor=None):
+        self.feature_engineer = feature_engineer
+        self.predictor = predictor
+        self.before_batch = before_batch
+        self.drift_monitor = drift_monitor
+
+    async def serve(self, websocket: WebSocket):
+        await websocket.accept()
+        queue = asyncio.Queue(maxsize=STREAM_MAX_INFLIGHT)
+        worker = asyncio.create_task(self._worker(websocket, queue))
+        try:
+            while True:
+                raw = await websocket.receive_text()
+                try:
+                    message = self._parse(raw)
+                except ValueError as e:
+                    await websocket.send_json({'type': 'error', 'id': None, 'detail': str(e)})
+                    continue
+                await queue.put(message)  # blocks when full -> stop reading the socket
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await queue.put(_STOP)
+            await worker
+
+    @staticmethod
+    def _parse(raw):
+        try:
+            message = json.loads(raw)
+        except json.JSONDecodeError:
+            raise ValueError('Message is not valid JSON')
+        if not isinstance(message, dict) or message.get('type') not in ('predict', 'candle'):
+            raise ValueError("Message 'type' must be 'predict' or 'candle'")
+        if not isinstance(message.get('indicators'), dict):
+            raise ValueError("Message needs an 'indicators' object")
+        return message
+
+    async def _worker(self, websocket, queue):
+        # After a failed send keep draining (without predicting) until the
+        # reader's _STOP so a blocked queue.put() can never deadlock.
+        closed = False
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < STREAM_MAX_BATCH and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            stop = any(m is _STOP for m in batch)
+            batch = self._coalesce([m for m in batch if m is not _STOP])
+            if batch and not closed:
+                try:
+                    replies = await run_in_threadpool(self._predict, batch)
+                except Exception as e:
+                    logger.error(f"Stream prediction error: {str(e)}")
+                    replies = [
+                        {'type': 'error', 'id': m.get('id'), 'detail': f'Prediction failed: {str(e)}'}
+                        for m in batch
+                    ]
+                try:
+                    for reply in replies:
+                        await websocket.send_json(reply)
+                except Exception:
+                    closed = True  # client went away mid-batch
+            if stop:
+                return
+
+    @staticmethod
+    def _coalesce(batch):
+        """Keep only the newest queued candle push per symbol/timeframe."""
+        latest = {}
+        for i, m in enumerate(batch):
+            if m['type'] == 'candle':
+                latest[(m.get('symbol'), m.get('timeframe'))] = i
+        keep = set(latest.values())
+        return [m for i, m in enumerate(batch) if m['type'] != 'candle' or i in keep]
+
+    def _predict(self, batch):
+        if self.before_batch is not None:
+            self.before_batch()
+
+        indicators = np.array([
+            [_as_float(m['indicators'].get(name)) for name in INDICATOR_FIELDS]
+            for m in batch
+        ])
+        features = self.feature_engineer.prepare_feature_matrix(indicators)
+
+        # One model call per symbol/timeframe present in the batch
+        groups = {}
+        for i, m in enumerate(batch):
+            groups.setdefault((m.get('symbol'), m.get('timeframe')), []).append(i)
+        directions = np.zeros(len(batch), dtype=np.int8)
+        probabilities = np.zeros(len(batch))
+        codes = np.zeros(len(batch), dtype=np.uint8)
+        for (symbol, timeframe), rows in groups.items():
+            directions[rows], probabilities[rows], codes[rows] = self.predictor.predict_batch(
+                features[rows], self.feature_engineer.feature_names, symbol, timeframe
+            )
+            if self.drift_monitor is not None:
+                self.drift_monitor.observe(
+                    symbol, timeframe, features[rows], self.feature_engineer.feature_names, indicators[rows]
+                )
+
+        timestamp = int(datetime.now().timestamp() * 1000)
+        return [
+            {
+                'type': 'prediction',
+                'id': m.get('id') if m['type'] == 'predict' else None,
+                'candle_timestamp': m.get('candle_timestamp') if m['type'] == 'candle' else None,
+                'close': m['indicators'].get('close') if m['type'] == 'candle' else None,
+                'symbol': m.get('symbol'),
+                'timeframe': m.get('timeframe'),
+                'direction': _DIRECTIONS[int(direction)],
+                'probability': round(float(probability), 4),
+                'confidence': str(CONFIDENCE_LABELS[code]),
+                'timestamp': timestamp,
+            }
+            for m, direction, probability, code in zip(batch, directions, probabilities, codes)
+        ]
+
+
+def _as_float(value):
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
@@ -2,10 +2,47 @@ import os
 import joblib
 import numpy as np
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+from services.calibration import (
+    apply_calibration, confidence_codes, constant_calibration, thresholds_of, CONFIDENCE_LABELS
+)
+from utils.artifacts import ArtifactWatcher
+from utils.dtypes import FEATURE_DTYPE, as_features
+from utils.metrics import INFERENCE_SECONDS, MODEL_LOAD_SECONDS, FALLBACK_MODEL_PREDICTIONS
 
 logger = logging.getLogger(__name__)
 
+# Model trained with remapped labels: 0=down, 1=neutral, 2=up
+_CLASS_TO_DIRECTION = np.array([-1, 0, 1], dtype=np.int8)
+
+
+def confidence_level(probability: float, thresholds=None) -> str:
+    """Map a calibrated probability to the model's high/medium/low label."""
+    codes = confidence_codes(np.array([probability]), thresholds or thresholds_of(None))
+    return str(CONFIDENCE_LABELS[codes[0]])
+
+
+def align_features(feature_matrix: np.ndarray, feature_names: List[str], model, metadata) -> np.ndarray:
+    """
+    Reorder FeatureEngineer-ordered columns to the model's own feature list
+    (missing columns become 0) and check the width the model expects.
+    """
+    model_names = (metadata or {}).get('feature_names')
+    if model_names and list(model_names) != list(feature_names):
+        positions = {name: i for i, name in enumerate(feature_names)}
+        padded = np.column_stack([feature_matrix, np.zeros(len(feature_matrix), dtype=feature_matrix.dtype)])
+        columns = [positions.get(name, feature_matrix.shape[1]) for name in model_names]
+        feature_matrix = padded[:, columns]
+
+    expected = getattr(model, 'n_features_in_', None)
+    if expected is not None and feature_matrix.shape[1] != expected:
+        raise ValueError(
+            f"Feature count mismatch: model expects {expected}, got {feature_matrix.shape[1]}. "
+            "Retrain the model after feature engineering changes."
+        )
+    return feature_matrix
+
 
 class Predictor:
     """
@@ -16,29 +53,114 @@ class Predictor:
         self.model_path = os.getenv('MODEL_PATH', './models')
         self.model = None
         self.model_metadata = None
+        # Notices artifacts retrained by another worker process
+        self._watcher = ArtifactWatcher()
+        self._loaded_key = ('ETHUSDT', '1h')
+        # Other (symbol, timeframe) models, loaded on first use:
+        # key -> {'model', 'metadata', 'watcher'}; model is None if no artifact exists
+        self._registry = {}
         self.load_model()
 
+    def _artifact_path(self, symbol, timeframe):
+        return os.path.join(self.model_path, f"latest_model_{symbol}_{timeframe}.joblib")
+
+    @staticmethod
+    def _read_artifact(model_file):
+        model_data = joblib.load(model_file)
+        metadata = {
+            'symbol': model_data.get('symbol'),
+            'timeframe': model_data.get('timeframe'),
+            'accuracy': model_data.get('accuracy'),
+            'trained_at': model_data.get('trained_at'),
+            'feature_names': model_data.get('feature_names', []),
+            'calibration': model_data.get('calibration'),
+            'model_type': model_data.get('model_type', 'xgboost'),
+            'reference_stats': model_data.get('reference_stats'),
+            'global_importance': model_data.get('global_importance')
+        }
+        return model_data['model'], metadata
+
     def load_model(self, symbol='ETHUSDT', timeframe='1h'):
         """
         Load the latest trained model
         """
+        with MODEL_LOAD_SECONDS.time():
+            self._loaded_key = (symbol, timeframe)
+            self._watcher.mark(self._artifact_path(symbol, timeframe))
+            self._load_model(symbol, timeframe)
+            self._registry.pop((symbol, timeframe), None)
+
+    def publish(self, symbol, timeframe):
+        """
+        Make a freshly saved latest_model_<symbol>_<timeframe> live in this process
+        """
+        if (symbol, timeframe) == self._loaded_key:
+            self.load_model(symbol, timeframe)
+        else:
+            self._registry.pop((symbol, timeframe), None)
+
+    def _select(self, symbol=None, timeframe=None):
+        """
+        (model, metadata) for a symbol/timeframe, falling back to the default model
+        """
+        self.reload_if_changed()
+        key = (symbol, timeframe)
+        if symbol is None or timeframe is None or key == self._loaded_key:
+            return self.model, self.model_metadata
+
+        entry = self._registry.get(key)
+        if entry is None or entry['watcher'].changed():
+            path = self._artifact_path(symbol, timeframe)
+            entry = {'model': None, 'metadata': None, 'watcher': ArtifactWatcher(path)}
+            if os.path.exists(path):
+                try:
+                    with MODEL_LOAD_SECONDS.time():
+                        entry['model'], entry['metadata'] = self._read_artifact(path)
+                    logger.info(f"Model loaded for {symbol} {timeframe} from {path}")
+                except Exception as e:
+                    logger.error(f"Failed to load model for {symbol} {timeframe}: {str(e)}")
+            self._registry[key] = entry
+
+        if entry['model'] is None:
+            return self.model, self.model_metadata
+        return entry['model'], entry['metadata']
+
+    @property
+    def default_key(self):
+        return self._loaded_key
+
+    def resolve(self, symbol=None, timeframe=None):
+        """
+        (model, metadata) that serves symbol/timeframe
+        """
+        return self._select(symbol, timeframe)
+
+    def metadata_for(self, symbol=None, timeframe=None):
+        """
+        Metadata of the model that serves symbol/timeframe
+        """
+        return self._select(symbol, timeframe)[1]
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload when the latest artifact on disk is newer than the loaded one
+        """
+        if not self._watcher.changed():
+            return False
+        logger.info("Model artifact changed on disk, reloading")
+        self.load_model(*self._loaded_key)
+        return True
+
+    def _load_model(self, symbol, timeframe):
         try:
-            model_file = os.path.join(self.model_path, f"latest_model_{symbol}_{timeframe}.joblib")
+            model_file = self._artifact_path(symbol, timeframe)
 
             if not os.path.exists(model_file):
                 logger.warning(f"No model found at {model_file}. Using fallback model.")
                 self._create_fallback_model()
                 return
 
-            model_data = joblib.load(model_file)
-            self.model = model_data['model']
-            self.model_metadata = {
-                'symbol': model_data.get('symbol'),
-                'timeframe': model_data.get('timeframe'),
-                'accuracy': model_data.get('accuracy'),
-                'trained_at': model_data.get('trained_at'),
-                'feature_names': model_data.get('feature_names', [])
-            }
+            self.model, self.model_metadata = self._read_artifact(model_file)
 
             logger.info(f"Model loaded successfully from {model_file}")
             logger.info(f"Model accuracy: {self.model_metadata['accuracy']:.4f}")
@@ -67,53 +189,116 @@ class Predictor:
             'timeframe': '1h',
             'accuracy': 0.5,
             'trained_at': 'fallback',
-            'feature_names': []
+            'feature_names': [],
+            'model_type': 'fallback',
+            # Random-forest-on-noise probabilities mean nothing: report chance level
+            'calibration': constant_calibration()
         }
 
-    def predict(self, features: Dict[str, Any]) -> Dict[str, Any]:
+    def predict(self, features: Dict[str, Any], symbol=None, timeframe=None) -> Dict[str, Any]:
         """
-        Predict price direction
+        Predict price direction with the symbol/timeframe model (default model if none)
         """
         try:
-            if self.model is None:
+            model, metadata = self._select(symbol, timeframe)
+
+            if model is None:
                 raise ValueError("Model not loaded")
 
-            feature_vector = np.array(list(features.values())).reshape(1, -1)
+            with INFERENCE_SECONDS.time():
+                result = self._predict(features, model, metadata)
 
-            expected = getattr(self.model, 'n_features_in_', None)
-            if expected is not None and feature_vector.shape[1] != expected:
-                raise ValueError(
-                    f"Feature count mismatch: model expects {expected}, got {feature_vector.shape[1]}. "
-                    "Retrain the model after feature engineering changes."
-                )
+            if metadata.get('trained_at') == 'fallback':
+                FALLBACK_MODEL_PREDICTIONS.inc()
 
-            prediction_class = self.model.predict(feature_vector)[0]
+            logger.debug(f"Prediction: {result}")
+            return result
 
-            if hasattr(self.model, 'predict_proba'):
-                probabilities = self.model.predict_proba(feature_vector)[0]
-                max_prob = float(np.max(probabilities))
-            else:
-                max_prob = 0.6
+        except Exception as e:
+            logger.error(f"Prediction error: {str(e)}")
+            raise
 
-            # Model trained with remapped labels: 0=down, 1=neutral, 2=up
-            direction_map = {
-                0: -1,
-                1: 0,
-                2: 1
-            }
-            direction = direction_map.get(int(prediction_class), 0)
+    @staticmethod
+    def _predict(features: Dict[str, Any], model, metadata) -> Dict[str, Any]:
+        """
+        Run the model on a single feature dict
+        """
+        # Order by the model's own feature list so models trained before a
+        # feature was added keep working; fall back to dict order.
+        feature_names = (metadata or {}).get('feature_names')
+        if feature_names:
+            values = [features.get(name, 0.0) for name in feature_names]
+        else:
+            values = list(features.values())
+        feature_vector = np.array(values, dtype=FEATURE_DTYPE).reshape(1, -1)
 
-            result = {
-                'direction': int(direction),
-                'probability': max_prob,
-                'confidence_score': max_prob
-            }
+        expected = getattr(model, 'n_features_in_', None)
+        if expected is not None and feature_vector.shape[1] != expected:
+            raise ValueError(
+                f"Feature count mismatch: model expects {expected}, got {feature_vector.shape[1]}. "
+                "Retrain the model after feature engineering changes."
+            )
 
-            logger.info(f"Prediction: {result}")
-            return result
+        calibration = (metadata or {}).get('calibration')
+
+        if hasattr(model, 'predict_proba'):
+            # One model call: argmax of predict_proba == predict (an ensemble's
+            # predict would score every member a second time)
+            probabilities = model.predict_proba(feature_vector)
+            prediction_class = np.argmax(probabilities[0])
+            raw_prob = float(np.max(probabilities))
+            max_prob = float(apply_calibration(calibration, probabilities)[0])
+        else:
+            prediction_class = model.predict(feature_vector)[0]
+            raw_prob = max_prob = 0.6
+
+        # Model trained with remapped labels: 0=down, 1=neutral, 2=up
+        direction_map = {
+            0: -1,
+            1: 0,
+            2: 1
+        }
+        direction = direction_map.get(int(prediction_class), 0)
+
+        return {
+            'direction': int(direction),
+            'probability': max_prob,
+            'raw_probability': raw_prob,
+            'confidence_score': max_prob,
+            'confidence': confidence_level(max_prob, thresholds_of(calibration))
+        }
+
+    def predict_batch(self, feature_matrix: np.ndarray, feature_names: List[str], symbol=None, timeframe=None):
+        """
+        Predict a batch in one model call.
+        `feature_matrix` columns follow `feature_names` (FeatureEngineer order) and
+        are reordered to the model's own feature list.
+        Returns (directions, calibrated probabilities, confidence codes 0/1/2 = low/medium/high).
+        """
+        try:
+            model, metadata = self._select(symbol, timeframe)
+
+            if model is None:
+                raise ValueError("Model not loaded")
+
+            with INFERENCE_SECONDS.time():
+                feature_matrix = align_features(as_features(feature_matrix), feature_names, model, metadata)
+
+                # argmax of predict_proba == predict for both XGBoost and the fallback forest
+                probabilities = model.predict_proba(feature_matrix)
+                classes = np.argmax(probabilities, axis=1)
+                directions = _CLASS_TO_DIRECTION[classes]
+                calibration = (metadata or {}).get('calibration')
+                max_prob = apply_calibration(calibration, probabilities)
+                codes = confidence_codes(max_prob, thresholds_of(calibration))
+
+            if metadata.get('trained_at') == 'fallback':
+                FALLBACK_MODEL_PREDICTIONS.inc(len(directions))
+
+            return directions, max_prob, codes
 
         except Exception as e:
-            logger.error(f"Prediction error: {str(e)}")
+            logger.error(f"Batch prediction error: {str(e)}")
             raise
 
     def is_model_loaded(self) -> bool:
@@ -126,17 +311,29 @@ class Predictor:
         """
         Get information about the loaded model
         """
+        self.reload_if_changed()
         if not self.model_metadata:
             return {
                 'loaded': False,
                 'message': 'No model loaded'
             }
 
-        return {
+        info = {
             'loaded': True,
+            'model_type': self.model_metadata.get('model_type', 'xgboost'),
             'symbol': self.model_metadata.get('symbol'),
             'timeframe': self.model_metadata.get('timeframe'),
             'accuracy': self.model_metadata.get('accuracy'),
             'trained_at': self.model_metadata.get('trained_at'),
-            'feature_count': len(self.model_metadata.get('feature_names', []))
+            'feature_count': len(self.model_metadata.get('feature_names', [])),
+            'calibration': (self.model_metadata.get('calibration') or {}).get('method', 'none'),
+            'confidence_thresholds': thresholds_of(self.model_metadata.get('calibration')),
+            'other_models': [
+                f"{symbol}_{timeframe}" for (symbol, timeframe), entry in self._registry.items()
+                if entry['model'] is not None
+            ]
         }
+        if hasattr(self.model, 'describe'):
+            info['members'] = self.model.describe()
+            info['aggregation'] = self.model.aggregation
+        return info
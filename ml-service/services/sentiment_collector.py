@@ -9,6 +9,7 @@ import json
 import time
 import sqlite3
 import logging
+import threading
 import urllib.request
 from datetime import datetime, timedelta
 
@@ -33,27 +34,102 @@ SUBREDDITS = ['ethereum', 'ethtrader', 'CryptoCurrency']
 class SentimentCollector:
 
     def __init__(self):
+        # One long-lived connection per collector; sqlite3 connections are not
+        # safe to share across threads without serialising access ourselves.
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
         self._init_db()
 
+    def _connect(self):
+        # A connection must not be used across fork(), e.g. by preloaded
+        # gunicorn workers; each process opens its own.
+        if self._conn is not None and self._conn_pid != os.getpid():
+            self._conn = None
+        if self._conn is None:
+            self._conn_pid = os.getpid()
+            os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+            self._conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
     def _init_db(self):
-        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-        conn = sqlite3.connect(DB_PATH)
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS sentiment_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                collected_at TEXT NOT NULL,
-                source TEXT NOT NULL,
-                text TEXT NOT NULL,
-                auto_label INTEGER NOT NULL,   -- -1 bearish, 0 neutral, 1 bullish
-                label_confidence REAL NOT NULL,
-                post_score INTEGER DEFAULT 0,
-                used_for_training INTEGER DEFAULT 0
+        with self._lock:
+            conn = self._connect()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sentiment_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    collected_at TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    auto_label INTEGER NOT NULL,   -- -1 bearish, 0 neutral, 1 bullish
+                    label_confidence REAL NOT NULL,
+                    post_score INTEGER DEFAULT 0,
+                    used_for_training INTEGER DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_source ON sentiment_data(source)')
+            # Walk newest-first and filter on confidence inside the index; text is
+            # then read by rowid only for the rows returned. Covering text as well
+            # would roughly double the database size for one table lookup per
+            # training row. The index also serves every collected_at lookup, so
+            # the older single-column index and text-covering index are dropped.
+            conn.execute('DROP INDEX IF EXISTS idx_collected_at')
+            conn.execute('DROP INDEX IF EXISTS idx_training_cover')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_collected_labels '
+                'ON sentiment_data(collected_at, label_confidence, auto_label)'
             )
-        ''')
-        conn.execute('CREATE INDEX IF NOT EXISTS idx_collected_at ON sentiment_data(collected_at)')
-        conn.execute('CREATE INDEX IF NOT EXISTS idx_source ON sentiment_data(source)')
-        conn.commit()
-        conn.close()
+
+            # Per-label counters kept up to date by triggers so get_stats never
+            # scans sentiment_data.
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sentiment_stats (
+                    auto_label INTEGER PRIMARY KEY,
+                    n INTEGER NOT NULL DEFAULT 0,
+                    oldest TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_sentiment_stats_insert
+                AFTER INSERT ON sentiment_data
+                BEGIN
+                    INSERT INTO sentiment_stats (auto_label, n, oldest)
+                    VALUES (NEW.auto_label, 1, NEW.collected_at)
+                    ON CONFLICT(auto_label) DO UPDATE SET
+                        n = n + 1,
+                        oldest = CASE WHEN oldest IS NULL OR NEW.collected_at < oldest
+                                      THEN NEW.collected_at ELSE oldest END;
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_sentiment_stats_delete
+                AFTER DELETE ON sentiment_data
+                BEGIN
+                    UPDATE sentiment_stats SET
+                        n = n - 1,
+                        oldest = (SELECT MIN(collected_at) FROM sentiment_data
+                                  WHERE auto_label = OLD.auto_label)
+                    WHERE auto_label = OLD.auto_label;
+                END
+            ''')
+
+            # Backfill counters for databases created before the stats table existed.
+            has_stats = conn.execute('SELECT 1 FROM sentiment_stats LIMIT 1').fetchone()
+            if not has_stats:
+                conn.execute('''
+                    INSERT INTO sentiment_stats (auto_label, n, oldest)
+                    SELECT auto_label, COUNT(*), MIN(collected_at)
+                    FROM sentiment_data GROUP BY auto_label
+                ''')
+            conn.commit()
         logger.info(f"Sentiment DB initialized at {DB_PATH}")
 
     def auto_label(self, text: str) -> tuple:
@@ -101,8 +177,7 @@ class SentimentCollector:
     def collect_and_store(self):
         """Main collection method — call this daily via scheduler."""
         collected_at = datetime.utcnow().isoformat()
-        conn = sqlite3.connect(DB_PATH)
-        inserted = 0
+        rows = []
 
         for sub in SUBREDDITS:
             posts = self.fetch_reddit(sub)
@@ -113,42 +188,54 @@ class SentimentCollector:
                 label, confidence = self.auto_label(text)
                 # Only store if we have some signal (skip very neutral text)
                 if confidence >= 0.55 or label != 0:
-                    conn.execute(
-                        'INSERT INTO sentiment_data (collected_at, source, text, auto_label, label_confidence, post_score) VALUES (?,?,?,?,?,?)',
-                        (collected_at, f'reddit/{sub}', text, label, confidence, post['score'])
-                    )
-                    inserted += 1
+                    rows.append((collected_at, f'reddit/{sub}', text, label, confidence, post['score']))
             time.sleep(1)  # Polite delay between subreddit requests
 
-        conn.commit()
-        conn.close()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                'INSERT INTO sentiment_data (collected_at, source, text, auto_label, label_confidence, post_score) VALUES (?,?,?,?,?,?)',
+                rows
+            )
+            conn.commit()
+        inserted = len(rows)
         logger.info(f"Collected {inserted} labeled posts")
         return inserted
 
     def get_training_data(self, min_confidence: float = 0.6, limit: int = 5000):
         """Return training data for the sentiment model."""
-        conn = sqlite3.connect(DB_PATH)
-        rows = conn.execute(
-            '''SELECT text, auto_label FROM sentiment_data
-               WHERE label_confidence >= ? ORDER BY collected_at DESC LIMIT ?''',
-            (min_confidence, limit)
-        ).fetchall()
-        conn.close()
+        with self._lock:
+            rows = self._connect().execute(
+                '''SELECT text, auto_label FROM sentiment_data INDEXED BY idx_collected_labels
+                   WHERE label_confidence >= ? ORDER BY collected_at DESC LIMIT ?''',
+                (min_confidence, limit)
+            ).fetchall()
         texts = [r[0] for r in rows]
         labels = [r[1] for r in rows]
         logger.info(f"Loaded {len(texts)} training samples (confidence >= {min_confidence})")
         return texts, labels
 
+    def get_sentiment_series(self):
+        """Return (collected_at, auto_label, label_confidence) rows oldest-first."""
+        with self._lock:
+            return self._connect().execute(
+                '''SELECT collected_at, auto_label, label_confidence
+                   FROM sentiment_data INDEXED BY idx_collected_labels
+                   ORDER BY collected_at'''
+            ).fetchall()
+
     def get_stats(self):
-        """Return DB stats."""
-        conn = sqlite3.connect(DB_PATH)
-        total = conn.execute('SELECT COUNT(*) FROM sentiment_data').fetchone()[0]
-        bullish = conn.execute('SELECT COUNT(*) FROM sentiment_data WHERE auto_label=1').fetchone()[0]
-        bearish = conn.execute('SELECT COUNT(*) FROM sentiment_data WHERE auto_label=-1').fetchone()[0]
-        neutral = conn.execute('SELECT COUNT(*) FROM sentiment_data WHERE auto_label=0').fetchone()[0]
-        oldest = conn.execute('SELECT MIN(collected_at) FROM sentiment_data').fetchone()[0]
-        conn.close()
+        """Return DB stats from the trigger-maintained counters (at most 3 rows)."""
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT auto_label, n, oldest FROM sentiment_stats'
+            ).fetchall()
+        counts = {label: n for label, n, _ in rows}
+        oldest = min((o for _, n, o in rows if n > 0 and o is not None), default=None)
         return {
-            'total': total, 'bullish': bullish, 'bearish': bearish, 'neutral': neutral,
+            'total': sum(counts.values()),
+            'bullish': counts.get(1, 0),
+            'bearish': counts.get(-1, 0),
+            'neutral': counts.get(0, 0),
             'oldest_sample': oldest
         }
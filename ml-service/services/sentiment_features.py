@@ -0,0 +1,134 @@
+"""
+Sentiment Feature Index
+Turns the labeled posts collected by sentiment_collector.py into rolling,
+per-candle features for the price-direction model.
+
+Posts are held in memory as sorted timestamp arrays with cumulative sums, so
+an as-of lookup for any batch of candle timestamps is two searchsorted calls
+and a few array subtractions — the same path serves training and /predict.
+"""
+import time
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rolling window used for every sentiment feature (24h of posts)
+DEFAULT_WINDOW_MS = 24 * 60 * 60 * 1000
+
+SENTIMENT_FEATURE_NAMES = ['sentiment_mean', 'sentiment_weighted', 'sentiment_volume']
+
+
+def _iso_to_ms(values) -> np.ndarray:
+    """Convert ISO-8601 UTC strings (as stored by the collector) to epoch ms."""
+    parsed = np.array(values, dtype='datetime64[ms]')
+    return parsed.astype(np.int64)
+
+
+class SentimentFeatureIndex:
+    """
+    In-memory time index over collected sentiment posts.
+    """
+
+    def __init__(self, window_ms: int = DEFAULT_WINDOW_MS):
+        self.window_ms = window_ms
+        self._set_arrays(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+        self.refreshed_at = None
+        self._last_check = 0.0
+
+    def _set_arrays(self, ts, labels, confidences):
+        # Prefix sums with a leading zero so window sums are cum[hi] - cum[lo]
+        zero = np.zeros(1)
+        arrays = {
+            'ts': ts,
+            'count': np.arange(len(ts) + 1, dtype=np.float64),
+            'label': np.concatenate([zero, np.cumsum(labels, dtype=np.float64)]),
+            'conf': np.concatenate([zero, np.cumsum(confidences, dtype=np.float64)]),
+            'weighted': np.concatenate([zero, np.cumsum(labels * confidences, dtype=np.float64)]),
+        }
+        # Single reference swap, so concurrent readers see old or new arrays, never a mix
+        self._arrays = arrays
+
+    def load(self, rows):
+        """
+        Build the index from (collected_at, auto_label, label_confidence) rows.
+        Rows need not be sorted.
+        """
+        if rows:
+            collected_at, labels, confidences = zip(*rows)
+            ts = _iso_to_ms(collected_at)
+            labels = np.asarray(labels, dtype=np.float64)
+            confidences = np.asarray(confidences, dtype=np.float64)
+            order = np.argsort(ts, kind='stable')
+            self._set_arrays(ts[order], labels[order], confidences[order])
+        else:
+            self._set_arrays(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+
+        self.refreshed_at = datetime.utcnow().isoformat()
+        logger.info(f"Sentiment feature index loaded with {len(rows)} posts")
+
+    def refresh(self, collector):
+        """Reload the index from a SentimentCollector."""
+        try:
+            self.load(collector.get_sentiment_series())
+        except Exception as e:
+            logger.error(f"Sentiment feature index refresh failed: {e}")
+
+    def refresh_if_stale(self, collector, interval: float = 30.0) -> bool:
+        """
+        Reload when the collector's row count moved (e.g. another worker ran
+        /sentiment/collect). Checked at most every `interval` seconds.
+        """
+        now = time.monotonic()
+        if now - self._last_check < interval:
+            return False
+        self._last_check = now
+        total = collector.get_stats()['total']
+        if total == len(self):
+            return False
+        self.refresh(collector)
+        return True
+
+    def __len__(self):
+        return len(self._arrays['ts'])
+
+    def features_at(self, timestamps_ms) -> np.ndarray:
+        """
+        Vectorized as-of join: for each candle timestamp (epoch ms) aggregate
+        the posts collected in (t - window, t]. Returns an (n, 3) array ordered
+        as SENTIMENT_FEATURE_NAMES; windows with no posts are neutral zeros.
+        """
+        arrays = self._arrays
+        t = np.asarray(timestamps_ms, dtype=np.int64).reshape(-1)
+        hi = np.searchsorted(arrays['ts'], t, side='right')
+        lo = np.searchsorted(arrays['ts'], t - self.window_ms, side='right')
+
+        count = arrays['count'][hi] - arrays['count'][lo]
+        label_sum = arrays['label'][hi] - arrays['label'][lo]
+        conf_sum = arrays['conf'][hi] - arrays['conf'][lo]
+        weighted_sum = arrays['weighted'][hi] - arrays['weighted'][lo]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, label_sum / count, 0.0)
+            weighted = np.where(conf_sum > 0, weighted_sum / conf_sum, 0.0)
+
+        return np.column_stack([mean, weighted, count])
+
+    def features_for(self, timestamp_ms=None) -> dict:
+        """Sentiment features for a single timestamp (defaults to now)."""
+        if timestamp_ms is None:
+            timestamp_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        row = self.features_at([timestamp_ms])[0]
+        return dict(zip(SENTIMENT_FEATURE_NAMES, row.tolist()))
+
+    def get_info(self) -> dict:
+        ts = self._arrays['ts']
+        return {
+            'posts': int(len(ts)),
+            'window_hours': self.window_ms / 3_600_000,
+            'oldest_ms': int(ts[0]) if len(ts) else None,
+            'newest_ms': int(ts[-1]) if len(ts) else None,
+            'refreshed_at': self.refreshed_at
+        }
@@ -0,0 +1,187 @@
+"""
+Offline evaluation of ML direction signals against stored candles.
+
+One pass over the history: the indicator frame becomes a feature matrix
+(prepare_feature_matrix), one predict_batch call scores every candle, and
+trade outcomes are simulated for all candles at once on (n, max_hold_bars)
+sliding-window views of the future highs/lows/closes.
+
+Trades follow the backend risk manager: entry at the signal candle's close,
+stop 1.5 x ATR away (1% of price when ATR is missing), and exit at TP1 =
+1.5R, which is where paper trading closes the position. If neither level is
+hit within max_hold_bars the trade exits at that bar's close. When one
+candle touches both levels the stop is assumed to have filled first.
+
+Each candle's signal is scored on its own (trades may overlap), so the
+report measures signal quality rather than a single-position account.
+The model has usually seen part of this history in training, so numbers
+for that period are optimistic.
+"""
+import time
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.calibration import CONFIDENCE_LABELS
+from utils.admission import run_blocking
+from utils.candle_store import load_history
+
+logger = logging.getLogger(__name__)
+
+# Mirrors backend riskManager.calculateEnhancedRisk / paperTrading TP1 exit
+ATR_MULTIPLIER = 1.5
+REWARD_RATIO = 1.5
+MAX_HOLD_BARS = 48
+
+OUTCOME_TP, OUTCOME_SL, OUTCOME_TIMEOUT = 1, -1, 0
+
+
+def _future_windows(values, bars):
+    """(n, bars) view of values[i+1 : i+1+bars] per row, NaN past the end."""
+    padded = np.concatenate([values[1:], np.full(bars, np.nan)])
+    return sliding_window_view(padded, bars)[:len(values)]
+
+
+def simulate_trades(close, high, low, atr, directions, atr_multiplier=ATR_MULTIPLIER,
+                    reward_ratio=REWARD_RATIO, max_hold_bars=MAX_HOLD_BARS):
+    """
+    Outcome of entering at every candle in `directions` (+1 long, -1 short, 0 none).
+    Returns a dict of per-candle arrays; 'evaluable' is False for no-trade candles
+    and for trades still open when the history ends.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    d = np.asarray(directions, dtype=np.float64)
+    atr = np.asarray(atr, dtype=np.float64)
+    safe_atr = np.where(np.isfinite(atr) & (atr > 0), atr, close * 0.01)
+    stop_distance = safe_atr * atr_multiplier
+
+    stop = close - d * stop_distance
+    target = close + d * stop_distance * reward_ratio
+
+    future_high = _future_windows(np.asarray(high, dtype=np.float64), max_hold_bars)
+    future_low = _future_windows(np.asarray(low, dtype=np.float64), max_hold_bars)
+    future_close = _future_windows(close, max_hold_bars)
+
+    is_long = (d > 0)[:, None]
+    tp_hit = np.where(is_long, future_high >= target[:, None], future_low <= target[:, None])
+    sl_hit = np.where(is_long, future_low <= stop[:, None], future_high >= stop[:, None])
+
+    never = max_hold_bars
+    first_tp = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), never)
+    first_sl = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), never)
+    available = np.minimum(max_hold_bars, len(close) - 1 - np.arange(len(close)))
+
+    stopped = (first_sl < never) & (first_sl <= first_tp)
+    took_profit = (first_tp < never) & ~stopped
+    timed_out = ~stopped & ~took_profit & (available == max_hold_bars)
+
+    last_close = future_close[np.arange(len(close)), np.maximum(available - 1, 0)]
+    exit_price = np.where(stopped, stop, np.where(took_profit, target, last_close))
+    bars_held = np.where(stopped, first_sl + 1, np.where(took_profit, first_tp + 1, available))
+
+    outcome = np.where(stopped, OUTCOME_SL, np.where(took_profit, OUTCOME_TP, OUTCOME_TIMEOUT))
+    evaluable = (d != 0) & (stopped | took_profit | timed_out)
+    move = d * (exit_price - close)
+    return {
+        'evaluable': evaluable,
+        'outcome': outcome,
+        'pnl_pct': np.where(evaluable, move / close * 100, 0.0),
+        'r_multiple': np.where(evaluable, move / stop_distance, 0.0),
+        'bars_held': bars_held,
+    }
+
+
+def summarize(pnl_pct, r_multiple, outcome, bars_held):
+    """Hit rate, expectancy and drawdown for one bucket of trades (chronological order)."""
+    n = len(pnl_pct)
+    if n == 0:
+        return {'trades': 0}
+    equity = np.cumsum(pnl_pct)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity
+    gains = pnl_pct[pnl_pct > 0].sum()
+    losses = -pnl_pct[pnl_pct < 0].sum()
+    return {
+        'trades': int(n),
+        'hit_rate': round(float(np.mean(outcome == OUTCOME_TP)), 4),
+        'win_rate': round(float(np.mean(pnl_pct > 0)), 4),
+        'expectancy_pct': round(float(pnl_pct.mean()), 4),
+        'expectancy_r': round(float(r_multiple.mean()), 4),
+        'profit_factor': round(float(gains / losses), 4) if losses > 0 else None,
+        'total_return_pct': round(float(equity[-1]), 4),
+        'max_drawdown_pct': round(float(drawdown.max()), 4),
+        'avg_bars_held': round(float(bars_held.mean()), 2),
+        'outcomes': {
+            'take_profit': int(np.sum(outcome == OUTCOME_TP)),
+            'stop_loss': int(np.sum(outcome == OUTCOME_SL)),
+            'timeout': int(np.sum(outcome == OUTCOME_TIMEOUT)),
+        },
+    }
+
+
+class SignalEvaluator:
+    """
+    Replays stored history through the serving model and scores the signals
+    """
+
+    def __init__(self, feature_engineer, predictor, candle_store=None):
+        self.feature_engineer = feature_engineer
+        self.predictor = predictor
+        self.candle_store = candle_store
+
+    async def evaluate(self, symbol='ETHUSDT', timeframe='1h', lookback_periods=5000,
+                       start=None, end=None, **params):
+        df = await load_history(self.candle_store, symbol, timeframe, lookback_periods, start, end)
+        return await run_blocking(self.evaluate_frame, df, symbol, timeframe, **params)
+
+    def evaluate_frame(self, df, symbol=None, timeframe=None, atr_multiplier=ATR_MULTIPLIER,
+                       reward_ratio=REWARD_RATIO, max_hold_bars=MAX_HOLD_BARS):
+        timings = {}
+
+        start = time.perf_counter()
+        indicators = self.feature_engineer.dataframe_to_indicators(df)
+        features = self.feature_engineer.prepare_feature_matrix(indicators)
+        timings['features'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        directions, _, codes = self.predictor.predict_batch(
+            features, self.feature_engineer.feature_names, symbol, timeframe
+        )
+        timings['inference'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        trades = simulate_trades(
+            df['close'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(),
+            df['atr'].to_numpy() if 'atr' in df else np.full(len(df), np.nan),
+            directions, atr_multiplier=atr_multiplier, reward_ratio=reward_ratio,
+            max_hold_bars=max_hold_bars
+        )
+        mask = trades['evaluable']
+
+        def bucket(selector):
+            rows = mask & selector
+            return summarize(trades['pnl_pct'][rows], trades['r_multiple'][rows],
+                             trades['outcome'][rows], trades['bars_held'][rows])
+
+        by_confidence = {label: bucket(codes == i) for i, label in enumerate(CONFIDENCE_LABELS)}
+        by_direction = {'long': bucket(directions > 0), 'short': bucket(directions < 0)}
+        overall = bucket(np.ones(len(df), dtype=bool))
+        timings['simulation'] = time.perf_counter() - start
+
+        metadata = self.predictor.metadata_for(symbol, timeframe) or {}
+        return {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'model_trained_at': metadata.get('trained_at'),
+            'candles': int(len(df)),
+            'signals': int(np.sum(directions != 0)),
+            'params': {
+                'atr_multiplier': atr_multiplier,
+                'reward_ratio': reward_ratio,
+                'max_hold_bars': max_hold_bars,
+            },
+            'overall': overall,
+            'by_confidence': by_confidence,
+            'by_direction': by_direction,
+            'timings_seconds': {k: round(v, 4) for k, v in timings.items()},
+        }
@@ -0,0 +1,314 @@
+"""
+Admission control for HTTP requests (pure ASGI middleware).
+
+Every request (except /, /health and /metrics) is matched to an endpoint
+class with a priority and a concurrency limit, then:
+
+  1. rejected at once when ADMISSION_MAX_IN_FLIGHT requests are already
+     admitted or queued, or, for low-priority classes, once in-flight work
+     passes ADMISSION_LOW_PRIORITY_SHED_RATIO of that bound;
+  2. rejected at once when its deadline has passed, or cannot be met given
+     the queue ahead of it and the class's recent service time (EWMA);
+  3. queued for a slot of its class. Low-priority work also waits while
+     any high-priority request is queued, and at most
+     ADMISSION_LOW_PRIORITY_SLOTS low-priority requests run at a time;
+  4. rejected if its deadline runs out while queued.
+
+Rejections are 503 with Retry-After, well before the caller's own timeout,
+so the backend falls back immediately instead of waiting 5s for work that
+would be thrown away.
+
+Deadlines come from the caller: X-Request-Deadline (absolute epoch ms) or
+X-Request-Timeout-Ms (budget from arrival). /predict and sentiment
+scoring default to the backend's 5s timeout. The deadline is visible to handlers through
+`remaining_time()` (database queries use it to cap their timeout).
+
+Handlers for low-priority work run their CPU-bound parts through
+`run_blocking`, so a training run occupies a worker thread instead of the
+event loop that /predict is served from. There is no inline path, not even
+for profiled requests: admission and deadline shedding need the loop free.
+
+WebSocket traffic is not admission-controlled; the prediction stream
+batches and bounds its own work.
+"""
+import os
+import json
+import time
+import asyncio
+import contextvars
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from utils.metrics import ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS
+from utils.profiling import run_traced
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '64'))
+ADMISSION_LOW_PRIORITY_SHED_RATIO = float(os.getenv('ADMISSION_LOW_PRIORITY_SHED_RATIO', '0.5'))
+ADMISSION_LOW_PRIORITY_SLOTS = int(os.getenv('ADMISSION_LOW_PRIORITY_SLOTS', '1'))
+ADMISSION_PREDICT_CONCURRENCY = int(os.getenv('ADMISSION_PREDICT_CONCURRENCY', '32'))
+ADMISSION_PREDICT_TIMEOUT_MS = int(os.getenv('ADMISSION_PREDICT_TIMEOUT_MS', '5000'))
+ADMISSION_SENTIMENT_TIMEOUT_MS = int(os.getenv('ADMISSION_SENTIMENT_TIMEOUT_MS', '5000'))
+
+PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW = 0, 1, 2
+PRIORITY_NAMES = {PRIORITY_HIGH: 'high', PRIORITY_NORMAL: 'normal', PRIORITY_LOW: 'low'}
+
+# (path prefix, class name, priority, concurrency, default timeout ms); first match wins
+ENDPOINT_CLASSES = [
+    ('/predict', 'predict', PRIORITY_HIGH, ADMISSION_PREDICT_CONCURRENCY, ADMISSION_PREDICT_TIMEOUT_MS),
+    ('/explain', 'explain', PRIORITY_NORMAL, 8, None),
+    ('/features', 'features', PRIORITY_NORMAL, 8, None),
+    ('/train', 'train', PRIORITY_LOW, 1, None),
+    ('/sentiment/train', 'sentiment_train', PRIORITY_LOW, 1, None),
+    ('/sentiment/collect', 'sentiment_collect', PRIORITY_LOW, 1, None),
+    # Scoring and info are cheap: never queued behind a training run
+    ('/sentiment', 'sentiment', PRIORITY_NORMAL, 4, ADMISSION_SENTIMENT_TIMEOUT_MS),
+    ('/evaluate', 'evaluate', PRIORITY_LOW, 1, None),
+    ('/candles/sync', 'candles_sync', PRIORITY_LOW, 1, None),
+]
+DEFAULT_CLASS = ('default', PRIORITY_NORMAL, 16, None)
+EXEMPT_PATHS = {'/', '/health', '/metrics'}
+
+# Weight of the newest sample in the per-class service time average
+_EWMA_ALPHA = 0.2
+
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+def remaining_time():
+    """Seconds left before the current request's deadline, or None if it has none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run blocking work in the threadpool (request contextvars carry over).
+    A profiled request traces it in the worker thread.
+    """
+    return await run_in_threadpool(run_traced, func, *args, **kwargs)
+
+
+class Rejected(Exception):
+    def __init__(self, reason, detail):
+        super().__init__(detail)
+        self.reason = reason
+
+
+class _EndpointClass:
+    def __init__(self, name, priority, concurrency, timeout_ms):
+        self.name = name
+        self.priority = priority
+        self.concurrency = concurrency
+        self.timeout_ms = timeout_ms
+        self.running = 0
+        self.waiting = 0
+        self.service_time = None  # EWMA seconds
+
+    def record(self, seconds):
+        if self.service_time is None:
+            self.service_time = seconds
+        else:
+            self.service_time += _EWMA_ALPHA * (seconds - self.service_time)
+
+
+class AdmissionController:
+    """
+    Shared admission state for one worker process
+    """
+
+    def __init__(self, classes=ENDPOINT_CLASSES, max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+                 low_priority_slots=ADMISSION_LOW_PRIORITY_SLOTS,
+                 low_priority_shed_ratio=ADMISSION_LOW_PRIORITY_SHED_RATIO):
+        self.prefixes = [(prefix, _EndpointClass(*spec)) for prefix, *spec in classes]
+        self.default = _EndpointClass(*DEFAULT_CLASS)
+        self.max_in_flight = max_in_flight
+        self.low_priority_slots = low_priority_slots
+        self.low_priority_shed_ratio = low_priority_shed_ratio
+        self.in_flight = 0
+        self._condition = None
+        self._loop = None
+
+    def classify(self, path):
+        if path in EXEMPT_PATHS:
+            return None
+        for prefix, endpoint in self.prefixes:
+            if path == prefix or path.startswith(prefix + '/'):
+                return endpoint
+        return self.default
+
+    def _get_condition(self):
+        # asyncio primitives belong to one loop (each TestClient / worker has its own)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._condition, self._loop = asyncio.Condition(), loop
+        return self._condition
+
+    def _endpoints(self):
+        return [endpoint for _, endpoint in self.prefixes] + [self.default]
+
+    def _high_waiting(self):
+        return sum(e.waiting for e in self._endpoints() if e.priority == PRIORITY_HIGH)
+
+    def _low_running(self):
+        return sum(e.running for e in self._endpoints() if e.priority == PRIORITY_LOW)
+
+    def _can_start(self, endpoint):
+        if endpoint.running >= endpoint.concurrency:
+            return False
+        if endpoint.priority == PRIORITY_LOW:
+            return self._high_waiting() == 0 and self._low_running() < self.low_priority_slots
+        return True
+
+    def _check_deadline(self, endpoint, deadline, queued_ahead):
+        if deadline is None:
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise Rejected('deadline_expired', 'Request deadline already passed')
+        if endpoint.service_time is not None:
+            expected = endpoint.service_time * (1 + queued_ahead / endpoint.concurrency)
+            if expected > remaining:
+                # Rejected work records no sample, so decay the estimate instead;
+                # otherwise one slow outlier could shut the class out for good
+                endpoint.service_time *= 1 - _EWMA_ALPHA
+                raise Rejected(
+                    'deadline_unmeetable',
+                    f"Expected completion in {expected * 1000:.0f}ms exceeds the "
+                    f"remaining {remaining * 1000:.0f}ms budget"
+                )
+
+    async def acquire(self, endpoint, deadline):
+        """Wait for a slot; raises Rejected. Pair every successful call with release()."""
+        if self.in_flight >= self.max_in_flight:
+            raise Rejected('queue_full', f"{self.in_flight} requests in flight")
+        if (endpoint.priority == PRIORITY_LOW
+                and self.in_flight >= self.max_in_flight * self.low_priority_shed_ratio):
+            raise Rejected('shed', 'Low-priority work is shed while the service is busy')
+        self._check_deadline(endpoint, deadline, endpoint.waiting)
+
+        condition = self._get_condition()
+        self.in_flight += 1
+        endpoint.waiting += 1
+        started = time.monotonic()
+        try:
+            async with condition:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    await asyncio.wait_for(condition.wait_for(lambda: self._can_start(endpoint)), timeout)
+                except asyncio.TimeoutError:
+                    raise Rejected('deadline_expired', 'Deadline passed while queued')
+                endpoint.waiting -= 1
+                endpoint.running += 1
+        except BaseException:
+            self.in_flight -= 1
+            endpoint.waiting -= 1
+            # The slot predicate of other waiters may have changed (fewer high-priority waiters)
+            await self._notify()
+            raise
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, priority=PRIORITY_NAMES[endpoint.priority])
+
+        try:
+            self._check_deadline(endpoint, deadline, 0)
+        except Rejected:
+            await self.release(endpoint, None)
+            raise
+
+    async def release(self, endpoint, service_seconds):
+        endpoint.running -= 1
+        self.in_flight -= 1
+        if service_seconds is not None:
+            endpoint.record(service_seconds)
+        await self._notify()
+
+    async def _notify(self):
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
+
+    def status(self):
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'endpoints': {
+                e.name: {
+                    'priority': PRIORITY_NAMES[e.priority],
+                    'running': e.running,
+                    'waiting': e.waiting,
+                    'concurrency': e.concurrency,
+                    'service_time_ms': None if e.service_time is None else round(e.service_time * 1000, 2),
+                }
+                for e in self._endpoints()
+            },
+        }
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def request_deadline(scope, endpoint):
+    """Monotonic deadline from X-Request-Deadline / X-Request-Timeout-Ms, else the class default."""
+    now = time.monotonic()
+    try:
+        absolute = _header(scope, b'x-request-deadline')
+        if absolute is not None:
+            return now + (float(absolute) / 1000 - time.time())
+        budget = _header(scope, b'x-request-timeout-ms')
+        if budget is not None:
+            return now + float(budget) / 1000
+    except ValueError:
+        pass
+    return None if endpoint.timeout_ms is None else now + endpoint.timeout_ms / 1000
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to HTTP requests
+    """
+
+    def __init__(self, app, controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        endpoint = self.controller.classify(scope['path'])
+        if endpoint is None:
+            return await self.app(scope, receive, send)
+
+        deadline = request_deadline(scope, endpoint)
+        try:
+            await self.controller.acquire(endpoint, deadline)
+        except Rejected as e:
+            ADMISSION_REJECTIONS.inc(endpoint=endpoint.name, reason=e.reason)
+            logger.warning(f"Rejected {scope['path']}: {e.reason}")
+            return await self._reject(send, e)
+
+        token = _deadline.set(deadline)
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+            await self.controller.release(endpoint, time.monotonic() - started)
+
+    @staticmethod
+    async def _reject(send, rejected):
+        body = json.dumps({'detail': str(rejected), 'reason': rejected.reason}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', b'1'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,62 @@
+"""
+Helpers for model artifacts shared between worker processes.
+
+Artifacts are written atomically (temp file + os.replace) so a worker never
+loads a half-written file, and each worker notices a newer artifact with a
+throttled os.stat instead of any IPC.
+"""
+import os
+import time
+import joblib
+
+# How often (seconds) a worker re-checks artifact mtimes; 0 checks every call
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', '2'))
+
+
+def atomic_dump(obj, path):
+    """joblib.dump to a temp file next to path, then atomically swap it in."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ArtifactWatcher:
+    """
+    Tracks the mtime of one artifact file. `changed()` costs one stat at most
+    every MODEL_RELOAD_INTERVAL seconds and is True once per new version.
+    """
+
+    def __init__(self, path=None, interval=MODEL_RELOAD_INTERVAL):
+        self.interval = interval
+        self.path = None
+        self._mtime = None
+        self._last_check = 0.0
+        if path:
+            self.mark(path)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def mark(self, path):
+        """Record the version of path that was just loaded (or found missing)."""
+        self.path = path
+        self._mtime = self._stat(path)
+        self._last_check = time.monotonic()
+
+    def changed(self) -> bool:
+        if self.path is None:
+            return False
+        now = time.monotonic()
+        if now - self._last_check < self.interval:
+            return False
+        self._last_check = now
+        mtime = self._stat(self.path)
+        return mtime is not None and mtime != self._mtime
@@ -0,0 +1,82 @@
+"""
+Compact binary framing for batched /predict/binary calls.
+
+Request  (little-endian):
+    header  '<4sBBHI'  magic b'ETHP', version, flags, n_cols, n_rows
+    body    float64[n_rows * n_cols], row-major, columns in INDICATOR_FIELDS
+            order; NaN = missing (server applies the /predict defaults).
+            Trailing columns (e.g. 'timestamp') may be omitted via n_cols.
+
+Response (little-endian):
+    header  '<4sBBHI'  magic b'ETHR', version, flags, n_cols=3, n_rows
+    body    int8[n_rows]     direction (-1 down, 0 neutral, 1 up)
+            uint8[n_rows]    confidence (0 low, 1 medium, 2 high)
+            float32[n_rows]  probability
+
+Decoding is a header unpack plus np.frombuffer — no per-value parsing.
+"""
+import struct
+import numpy as np
+
+CONTENT_TYPE = 'application/x-eth-predict'
+VERSION = 1
+MAX_ROWS = 65536
+
+_HEADER = struct.Struct('<4sBBHI')
+_REQUEST_MAGIC = b'ETHP'
+_RESPONSE_MAGIC = b'ETHR'
+
+CONFIDENCE_CODES = {'low': 0, 'medium': 1, 'high': 2}
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def _check_header(buf, magic):
+    if len(buf) < _HEADER.size:
+        raise ProtocolError('Payload shorter than header')
+    got_magic, version, _flags, n_cols, n_rows = _HEADER.unpack_from(buf)
+    if got_magic != magic:
+        raise ProtocolError(f'Bad magic {got_magic!r}')
+    if version != VERSION:
+        raise ProtocolError(f'Unsupported protocol version {version}')
+    return n_cols, n_rows
+
+
+def encode_request(indicators: np.ndarray) -> bytes:
+    matrix = np.ascontiguousarray(indicators, dtype='<f8')
+    n_rows, n_cols = matrix.shape
+    return _HEADER.pack(_REQUEST_MAGIC, VERSION, 0, n_cols, n_rows) + matrix.tobytes()
+
+
+def decode_request(buf: bytes, max_cols: int) -> np.ndarray:
+    n_cols, n_rows = _check_header(buf, _REQUEST_MAGIC)
+    if not 0 < n_cols <= max_cols:
+        raise ProtocolError(f'n_cols must be 1..{max_cols}, got {n_cols}')
+    if not 0 < n_rows <= MAX_ROWS:
+        raise ProtocolError(f'n_rows must be 1..{MAX_ROWS}, got {n_rows}')
+    expected = _HEADER.size + n_rows * n_cols * 8
+    if len(buf) != expected:
+        raise ProtocolError(f'Expected {expected} bytes, got {len(buf)}')
+    return np.frombuffer(buf, dtype='<f8', offset=_HEADER.size).reshape(n_rows, n_cols)
+
+
+def encode_response(directions, confidence_codes, probabilities) -> bytes:
+    n_rows = len(directions)
+    return b''.join([
+        _HEADER.pack(_RESPONSE_MAGIC, VERSION, 0, 3, n_rows),
+        np.asarray(directions, dtype='i1').tobytes(),
+        np.asarray(confidence_codes, dtype='u1').tobytes(),
+        np.asarray(probabilities, dtype='<f4').tobytes(),
+    ])
+
+
+def decode_response(buf: bytes):
+    """Returns (directions int8, confidence_codes uint8, probabilities float32)."""
+    _, n_rows = _check_header(buf, _RESPONSE_MAGIC)
+    offset = _HEADER.size
+    directions = np.frombuffer(buf, dtype='i1', count=n_rows, offset=offset)
+    confidence = np.frombuffer(buf, dtype='u1', count=n_rows, offset=offset + n_rows)
+    probabilities = np.frombuffer(buf, dtype='<f4', count=n_rows, offset=offset + 2 * n_rows)
+    return directions, confidence, probabilities
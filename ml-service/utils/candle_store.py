@@ -0,0 +1,276 @@
+"""
+Local on-disk candle store, one time-indexed series per (symbol, timeframe).
+
+Layout under CANDLE_STORE_PATH:
+
+    ETHUSDT_1h/manifest.json             {'version', 'rows', 'first', 'last', 'columns'}
+    ETHUSDT_1h/<version>/timestamp.npy   int64 epoch ms, strictly increasing
+    ETHUSDT_1h/<version>/<column>.npy    TRAINING_SCHEMA dtype, one file per column
+
+Columns are opened with np.load(mmap_mode='r'). A range read is two
+np.searchsorted calls on the mapped timestamps (O(log n)) plus slices that
+are read-only views into the mapped files, so only the k rows the caller
+touches are paged in; there is no Postgres round trip. `sync` appends rows
+newer than the last stored candle from the database.
+
+Writes build a complete new version directory and then atomically replace
+manifest.json, so readers (in any worker) see either the old or the new
+series, never a mix. The previous version stays on disk until the next
+write, for readers that picked up the old manifest just before the swap. Other workers notice a new manifest through the same
+throttled mtime check used for model artifacts.
+"""
+import os
+import json
+import fcntl
+import shutil
+import threading
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.admission import run_blocking
+from utils.artifacts import ArtifactWatcher
+from utils.database import NoTrainingDataError, clean_training_frame, get_candles_since, get_training_data
+from utils.dtypes import TIMESTAMP_DTYPE, TRAINING_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+CANDLE_STORE_PATH = os.getenv('CANDLE_STORE_PATH', './candles')
+# Rows per database page during sync
+CANDLE_SYNC_BATCH = int(os.getenv('CANDLE_SYNC_BATCH', '50000'))
+
+_MANIFEST = 'manifest.json'
+
+
+async def load_history(store, symbol, timeframe, lookback_periods, start=None, end=None):
+    """
+    Candles for a training/evaluation run: the [start, end) range from the
+    local store when either bound is given, else the latest
+    lookback_periods rows from the database.
+    """
+    if start is None and end is None:
+        return await get_training_data(symbol, timeframe, lookback_periods)
+    if store is None:
+        raise ValueError("Time ranges need a candle store")
+    return store.frame(symbol, timeframe, start, end)
+
+
+def _map_columns(version_dir, manifest):
+    return {
+        name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r')
+        for name in ['timestamp', *manifest['columns']]
+    }
+
+
+class CandleStore:
+    """
+    Memory-mapped, time-indexed candles for every synced symbol/timeframe
+    """
+
+    def __init__(self, root=CANDLE_STORE_PATH):
+        self.root = root
+        self._series = {}  # key -> (manifest, {column: memmap}, watcher)
+        self._lock = threading.Lock()
+
+    def _series_dir(self, symbol, timeframe):
+        return os.path.join(self.root, f"{symbol}_{timeframe}")
+
+    def _read_manifest(self, symbol, timeframe):
+        try:
+            with open(os.path.join(self._series_dir(symbol, timeframe), _MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _open(self, symbol, timeframe):
+        """(manifest, {column: memmap}) for the current version, or None."""
+        key = (symbol, timeframe)
+        with self._lock:
+            cached = self._series.get(key)
+            if cached is not None and not cached[2].changed():
+                return cached[0], cached[1]
+
+            series_dir = self._series_dir(symbol, timeframe)
+            watcher = cached[2] if cached else ArtifactWatcher()
+            watcher.mark(os.path.join(series_dir, _MANIFEST))
+            # A writer may publish (and prune) between reading the manifest and
+            # mapping its files; the manifest is newer on the second attempt
+            for attempt in range(2):
+                manifest = self._read_manifest(symbol, timeframe)
+                if manifest is None:
+                    self._series.pop(key, None)
+                    return None
+                try:
+                    columns = _map_columns(os.path.join(series_dir, manifest['version']), manifest)
+                    break
+                except FileNotFoundError:
+                    if attempt:
+                        raise
+            self._series[key] = (manifest, columns, watcher)
+            return manifest, columns
+
+    def info(self, symbol, timeframe):
+        opened = self._open(symbol, timeframe)
+        return None if opened is None else {'symbol': symbol, 'timeframe': timeframe, **opened[0]}
+
+    def list_series(self):
+        if not os.path.isdir(self.root):
+            return []
+        series = []
+        for name in sorted(os.listdir(self.root)):
+            symbol, _, timeframe = name.rpartition('_')
+            manifest = self._read_manifest(symbol, timeframe) if symbol else None
+            if manifest is not None:
+                series.append({'symbol': symbol, 'timeframe': timeframe, **manifest})
+        return series
+
+    @staticmethod
+    def _slice(manifest, mapped, i, j, columns):
+        names = ['timestamp', *(columns if columns is not None else manifest['columns'])]
+        unknown = [name for name in names if name not in mapped]
+        if unknown:
+            raise ValueError(f"Unknown candle columns: {unknown}. Stored: {manifest['columns']}")
+        return {name: mapped[name][i:j] for name in names}
+
+    def range(self, symbol, timeframe, start=None, end=None, columns=None):
+        """
+        {column: read-only view} for start <= timestamp < end (epoch ms,
+        None = open-ended); nothing is copied. None when the pair has no series.
+        """
+        opened = self._open(symbol, timeframe)
+        if opened is None:
+            return None
+        manifest, mapped = opened
+        timestamps = mapped['timestamp']
+        i = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        j = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return self._slice(manifest, mapped, i, max(i, j), columns)
+
+    def latest(self, symbol, timeframe, n, columns=None):
+        """Views of the last n rows."""
+        opened = self._open(symbol, timeframe)
+        if opened is None:
+            return None
+        manifest, mapped = opened
+        rows = len(mapped['timestamp'])
+        return self._slice(manifest, mapped, max(0, rows - n), rows, columns)
+
+    def frame(self, symbol, timeframe, start=None, end=None):
+        """
+        Training-ready DataFrame (copied, gap-filled like database rows) for a
+        time range; raises NoTrainingDataError when the range is empty.
+        """
+        views = self.range(symbol, timeframe, start, end)
+        if views is None or len(views['timestamp']) == 0:
+            raise NoTrainingDataError(
+                f"No locally stored candles for {symbol} {timeframe} in [{start}, {end}); "
+                "sync the candle store first"
+            )
+        return clean_training_frame(pd.DataFrame({name: np.array(view) for name, view in views.items()}))
+
+    def write(self, symbol, timeframe, df, replace=False):
+        """
+        Merge rows into the series (a re-sent timestamp replaces the stored
+        row), or replace it entirely, and publish the result as a new version.
+        Returns the manifest.
+        """
+        if df is None or len(df) == 0:
+            return self._read_manifest(symbol, timeframe)
+        series_dir = self._series_dir(symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        # One writer per series across workers; readers never block
+        with open(os.path.join(series_dir, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            manifest = self._write_locked(series_dir, df, replace)
+
+        with self._lock:
+            self._series.pop((symbol, timeframe), None)
+        logger.info(f"Candle store {symbol} {timeframe}: {manifest['rows']} rows ({manifest['version']})")
+        return manifest
+
+    def _write_locked(self, series_dir, df, replace):
+        names = [name for name in TRAINING_SCHEMA if name != 'timestamp' and name in df.columns]
+        incoming = {'timestamp': df['timestamp'].to_numpy(dtype=TIMESTAMP_DTYPE)}
+        incoming.update({name: df[name].to_numpy(dtype=TRAINING_SCHEMA[name]) for name in names})
+
+        # Merge against the manifest on disk, not a possibly stale cached mapping
+        current = None
+        try:
+            with open(os.path.join(series_dir, _MANIFEST)) as f:
+                current = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if current is not None and not replace:
+            mapped = _map_columns(os.path.join(series_dir, current['version']), current)
+            names = list(dict.fromkeys([*current['columns'], *names]))
+            merged = {}
+            for name in ['timestamp', *names]:
+                dtype = TRAINING_SCHEMA.get(name, TIMESTAMP_DTYPE)
+                old = mapped[name] if name in mapped else np.full(current['rows'], np.nan, dtype)
+                new = incoming[name] if name in incoming else np.full(len(df), np.nan, dtype)
+                merged[name] = np.concatenate([old, new])
+            incoming = merged
+
+        # Stable sort keeps incoming rows after stored ones; keep the last of each timestamp
+        order = np.argsort(incoming['timestamp'], kind='stable')
+        timestamps = incoming['timestamp'][order]
+        keep = order[np.append(timestamps[1:] != timestamps[:-1], True)]
+
+        version = f"v{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        version_dir = os.path.join(series_dir, version)
+        os.makedirs(version_dir)
+        for name in ['timestamp', *names]:
+            np.save(os.path.join(version_dir, f"{name}.npy"), np.ascontiguousarray(incoming[name][keep]))
+
+        stored = incoming['timestamp'][keep]
+        manifest = {
+            'version': version,
+            'rows': int(len(stored)),
+            'first': int(stored[0]),
+            'last': int(stored[-1]),
+            'columns': names,
+            'updated_at': datetime.now().isoformat(),
+        }
+        manifest_path = os.path.join(series_dir, _MANIFEST)
+        tmp_path = f"{manifest_path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+        # Keep the version just replaced: another worker may have read the old
+        # manifest and not mapped its files yet. Existing mappings of anything
+        # older stay valid after unlink (POSIX).
+        keep = {version, current['version'] if current else None}
+        for entry in os.listdir(series_dir):
+            if entry.startswith('v') and entry not in keep:
+                shutil.rmtree(os.path.join(series_dir, entry), ignore_errors=True)
+        return manifest
+
+    async def sync(self, symbol, timeframe, full=False):
+        """
+        Pull rows newer than the last stored candle (everything when full)
+        from the database, page by page, and publish them as one new version.
+        """
+        manifest = None if full else self._read_manifest(symbol, timeframe)
+        since = None if manifest is None else manifest['last']
+
+        pages = []
+        while True:
+            page = await get_candles_since(symbol, timeframe, since, CANDLE_SYNC_BATCH)
+            if page.empty:
+                break
+            pages.append(page)
+            since = int(page['timestamp'].iloc[-1])
+            if len(page) < CANDLE_SYNC_BATCH:
+                break
+
+        fetched = sum(len(page) for page in pages)
+        if pages:
+            manifest = await run_blocking(
+                self.write, symbol, timeframe, pd.concat(pages, ignore_index=True), replace=full
+            )
+
+        return {'symbol': symbol, 'timeframe': timeframe, 'fetched': fetched, **(manifest or {'rows': 0})}
@@ -1,34 +1,160 @@
+"""
+Async access to the candle/indicator tables the backend writes.
+
+One SQLAlchemy async engine per process and event loop (asyncpg for
+Postgres, aiosqlite for a local SQLite stand-in with the same tables); an
+engine left behind by a previous loop or a fork parent is disposed when its
+replacement is created. Each engine has a bounded pool so
+concurrent training runs and data reads queue for a connection instead of
+opening new ones: at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections per
+worker, and waiting longer than DB_POOL_TIMEOUT is an error. The queries are
+module-level constants, so SQLAlchemy compiles them once and asyncpg reuses
+its prepared statement per connection (DB_STATEMENT_CACHE_SIZE; set 0 behind
+pgbouncer in transaction mode). Each query is bounded by DB_QUERY_TIMEOUT,
+enforced by Postgres (statement_timeout) and by an asyncio deadline, which
+is shortened to the calling request's remaining admission deadline.
+
+Failures raise DatabaseError subclasses. Mock data is only returned when
+DATABASE_URL is unset and ALLOW_MOCK_DATA is enabled (local development,
+benchmarks), never in place of a failed or empty query.
+"""
 import os
-import pandas as pd
-from sqlalchemy import create_engine, text
+import asyncio
 import logging
 
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from utils.admission import remaining_time
+from utils.metrics import DB_FETCH_SECONDS, DB_QUERY_ERRORS
+from utils.dtypes import apply_schema
+
 logger = logging.getLogger(__name__)
 
-# Module-level singleton — creating a new engine per call leaks connection pool resources
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_CONNECT_TIMEOUT = float(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+DB_QUERY_TIMEOUT = float(os.getenv('DB_QUERY_TIMEOUT', '30'))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
+ALLOW_MOCK_DATA = os.getenv('ALLOW_MOCK_DATA', 'false').lower() in ('1', 'true', 'yes')
+
+# Sync URL schemes (as used by the backend / docker-compose) -> async driver
+_ASYNC_DRIVERS = {
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+class DatabaseError(Exception):
+    """Training data could not be read."""
+
+
+class DatabaseUnavailableError(DatabaseError):
+    """No database configured, or it could not be reached."""
+
+
+class DatabaseTimeoutError(DatabaseError):
+    """The query, or the wait for a pooled connection, ran out of time."""
+
+
+class NoTrainingDataError(DatabaseError):
+    """The query succeeded but returned no rows."""
+
+
+# Module-level singleton — creating a new engine per call leaks connection pool resources.
+# asyncpg connections belong to one event loop, so the engine is per (pid, loop).
 _engine = None
+_engine_owner = None
 
-def _get_engine():
-    global _engine
-    if _engine is None:
-        database_url = os.getenv('DATABASE_URL')
-        if database_url:
-            _engine = create_engine(database_url, pool_pre_ping=True)
+
+def async_database_url(url):
+    url = make_url(url)
+    return url.set(drivername=_ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def _engine_options(url):
+    if url.get_backend_name() == 'sqlite':
+        return {'connect_args': {'timeout': DB_CONNECT_TIMEOUT}}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+        'connect_args': {
+            'timeout': DB_CONNECT_TIMEOUT,
+            'prepared_statement_cache_size': DB_STATEMENT_CACHE_SIZE,
+            'server_settings': {
+                'statement_timeout': str(int(DB_QUERY_TIMEOUT * 1000)),
+                'application_name': 'eth-ml-service',
+            },
+        },
+    }
+
+
+async def _get_engine():
+    global _engine, _engine_owner
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        return None
+    owner = (os.getpid(), asyncio.get_running_loop())
+    if _engine is None or _engine_owner != owner:
+        previous, previous_owner = _engine, _engine_owner
+        url = async_database_url(database_url)
+        _engine = create_async_engine(url, **_engine_options(url))
+        _engine_owner = owner
+        if previous is not None:
+            await _retire_engine(previous, previous_owner)
     return _engine
 
 
-async def get_training_data(symbol='ETHUSDT', timeframe='1h', limit=500):
-    """
-    Fetch training data from PostgreSQL database
-    """
+async def _retire_engine(engine, owner):
+    """Release the pool of an engine created for another process or event loop."""
+    pid, loop = owner
+    if pid != os.getpid():
+        # Inherited across fork: the sockets belong to the parent, only drop them
+        await engine.dispose(close=False)
+        return
     try:
-        engine = _get_engine()
-        if not engine:
-            logger.warning("DATABASE_URL not set, using mock data")
-            return create_mock_data(limit)
+        if loop.is_running():
+            # Still serving on another thread: close the connections there
+            closing = asyncio.run_coroutine_threadsafe(engine.dispose(), loop)
+            await asyncio.wait_for(asyncio.wrap_future(closing), DB_CONNECT_TIMEOUT)
+        else:
+            await asyncio.wait_for(engine.dispose(), DB_CONNECT_TIMEOUT)
+    except Exception as e:
+        # Connections of a closed loop cannot always be closed cleanly
+        logger.warning(f"Could not close connections of a previous event loop: {str(e)}")
+        await engine.dispose(close=False)
+
+
+async def dispose_engine():
+    """Close pooled connections (service shutdown)."""
+    global _engine, _engine_owner
+    if _engine is not None and _engine_owner == (os.getpid(), asyncio.get_running_loop()):
+        await _engine.dispose()
+    _engine, _engine_owner = None, None
+
+
+def pool_status():
+    if _engine is None:
+        return {'configured': bool(os.getenv('DATABASE_URL')), 'mock_data': ALLOW_MOCK_DATA}
+    return {
+        'configured': True,
+        'driver': _engine.url.drivername,
+        'pool': _engine.pool.status(),
+    }
 
-        query = text("""
-            SELECT
+
+# Columns shared by the single-pair and bulk training queries
+_TRAINING_COLUMNS = """
                 o.timestamp,
                 o.open,
                 o.high,
@@ -48,72 +174,211 @@ async def get_training_data(symbol='ETHUSDT', timeframe='1h', limit=500):
                 i."bollingerUpper" as bollinger_upper,
                 i."bollingerMiddle" as bollinger_middle,
                 i."bollingerLower" as bollinger_lower
-            FROM ohlcv_data o
-            LEFT JOIN indicators i ON o.symbol = i.symbol
-                AND o.timeframe = i.timeframe
-                AND o.timestamp = i.timestamp
-            WHERE o.symbol = :symbol
-                AND o.timeframe = :timeframe
-                AND i.rsi IS NOT NULL
-            ORDER BY o.timestamp DESC
-            LIMIT :limit
-        """)
-
-        with engine.connect() as conn:
-            df = pd.read_sql(query, conn, params={
-                'symbol': symbol,
-                'timeframe': timeframe,
-                'limit': limit
-            })
-
-        if df.empty:
-            logger.warning("No data found in database, using mock data")
-            return create_mock_data(limit)
-
-        df = df.sort_values('timestamp').reset_index(drop=True)
-
-        # fillna(method=...) is deprecated in pandas >= 2.0
-        df = df.ffill().bfill()
-
-        logger.info(f"Fetched {len(df)} rows from database")
-        return df
+"""
 
-    except Exception as e:
-        logger.error(f"Database fetch error: {str(e)}")
-        return create_mock_data(limit)
+_TRAINING_QUERY = text(f"""
+    SELECT {_TRAINING_COLUMNS}
+    FROM ohlcv_data o
+    LEFT JOIN indicators i ON o.symbol = i.symbol
+        AND o.timeframe = i.timeframe
+        AND o.timestamp = i.timestamp
+    WHERE o.symbol = :symbol
+        AND o.timeframe = :timeframe
+        AND i.rsi IS NOT NULL
+    ORDER BY o.timestamp DESC
+    LIMIT :limit
+""")
+
+# Oldest-first page of rows after a timestamp (incremental sync of the local candle store)
+_CANDLES_SINCE_QUERY = text(f"""
+    SELECT {_TRAINING_COLUMNS}
+    FROM ohlcv_data o
+    LEFT JOIN indicators i ON o.symbol = i.symbol
+        AND o.timeframe = i.timeframe
+        AND o.timestamp = i.timestamp
+    WHERE o.symbol = :symbol
+        AND o.timeframe = :timeframe
+        AND o.timestamp > :since
+        AND i.rsi IS NOT NULL
+    ORDER BY o.timestamp ASC
+    LIMIT :limit
+""")
+
+# Latest `limit` rows per (symbol, timeframe) pair via a window function.
+# Expanding IN lists (not Postgres-only = ANY(array)) keep it SQLite-compatible.
+_BULK_TRAINING_QUERY = text(f"""
+    SELECT * FROM (
+        SELECT
+            o.symbol AS _symbol,
+            o.timeframe AS _timeframe,
+            ROW_NUMBER() OVER (
+                PARTITION BY o.symbol, o.timeframe ORDER BY o.timestamp DESC
+            ) AS _rn,
+            {_TRAINING_COLUMNS}
+        FROM ohlcv_data o
+        LEFT JOIN indicators i ON o.symbol = i.symbol
+            AND o.timeframe = i.timeframe
+            AND o.timestamp = i.timestamp
+        WHERE o.symbol IN :symbols
+            AND CAST(o.timeframe AS TEXT) IN :timeframes
+            AND i.rsi IS NOT NULL
+    ) ranked
+    WHERE _rn <= :limit
+""").bindparams(bindparam('symbols', expanding=True), bindparam('timeframes', expanding=True))
+
+
+async def _execute(engine, query, params):
+    async with engine.connect() as conn:
+        result = await conn.execute(query, params)
+        return result.keys(), result.fetchall()
+
+
+async def _fetch_frame(query, params, description):
+    """Run a query with the pool/timeout policy; DECIMAL values become floats."""
+    engine = await _get_engine()
+    if engine is None:
+        raise DatabaseUnavailableError("DATABASE_URL is not set")
+    # No point running past the deadline of the request that asked for the rows
+    remaining = remaining_time()
+    timeout = DB_QUERY_TIMEOUT if remaining is None else max(0.0, min(DB_QUERY_TIMEOUT, remaining))
+    try:
+        with DB_FETCH_SECONDS.time():
+            columns, rows = await asyncio.wait_for(_execute(engine, query, params), timeout)
+    except asyncio.TimeoutError:
+        DB_QUERY_ERRORS.inc(reason='timeout')
+        raise DatabaseTimeoutError(f"{description} exceeded its {timeout:.1f}s timeout")
+    except PoolTimeoutError:
+        DB_QUERY_ERRORS.inc(reason='pool_exhausted')
+        raise DatabaseTimeoutError(
+            f"{description}: no database connection free within DB_POOL_TIMEOUT ({DB_POOL_TIMEOUT}s)"
+        )
+    except (SQLAlchemyError, OSError) as e:
+        DB_QUERY_ERRORS.inc(reason='error')
+        raise DatabaseUnavailableError(f"{description} failed: {str(e)}") from e
+    return pd.DataFrame.from_records(rows, columns=list(columns), coerce_float=True)
+
+
+def _mock_data_or_raise(limit):
+    if not ALLOW_MOCK_DATA:
+        raise DatabaseUnavailableError(
+            "DATABASE_URL is not set (set ALLOW_MOCK_DATA=true to use synthetic data)"
+        )
+    logger.warning("DATABASE_URL not set, using mock data (ALLOW_MOCK_DATA)")
+    return create_mock_data(limit)
+
+
+async def get_training_data(symbol='ETHUSDT', timeframe='1h', limit=500):
+    """
+    Latest `limit` candles with indicators for one pair, oldest first.
+    Raises DatabaseError when the data cannot be read or there is none.
+    """
+    if not os.getenv('DATABASE_URL'):
+        return _mock_data_or_raise(limit)
+
+    df = await _fetch_frame(
+        _TRAINING_QUERY,
+        {'symbol': symbol, 'timeframe': timeframe, 'limit': limit},
+        f"Training data query for {symbol} {timeframe}"
+    )
+    if df.empty:
+        DB_QUERY_ERRORS.inc(reason='empty')
+        raise NoTrainingDataError(f"No candles with indicators stored for {symbol} {timeframe}")
+
+    df = clean_training_frame(df)
+
+    logger.info(f"Fetched {len(df)} rows from database")
+    return df
+
+
+async def get_candles_since(symbol, timeframe, since=None, limit=50000):
+    """
+    Up to `limit` rows with timestamp > since (epoch ms; None = from the
+    start), oldest first, cast to the schema but not gap-filled.
+    """
+    if not os.getenv('DATABASE_URL'):
+        raise DatabaseUnavailableError("DATABASE_URL is not set")
+    df = await _fetch_frame(
+        _CANDLES_SINCE_QUERY,
+        {'symbol': symbol, 'timeframe': timeframe, 'since': -1 if since is None else int(since), 'limit': limit},
+        f"Candle sync query for {symbol} {timeframe}"
+    )
+    return apply_schema(df)
+
+
+def clean_training_frame(df):
+    # DECIMAL columns can arrive as object dtype; cast before copying the frame around
+    df = apply_schema(df)
+    df = df.sort_values('timestamp').reset_index(drop=True)
+
+    # fillna(method=...) is deprecated in pandas >= 2.0
+    return df.ffill().bfill()
+
+
+async def get_training_data_bulk(symbols, timeframes, limit=500):
+    """
+    Fetch the latest `limit` rows for every (symbol, timeframe) pair in one
+    query. Returns {(symbol, timeframe): DataFrame}; pairs without rows are
+    absent. Raises DatabaseError when the query itself fails.
+    """
+    pairs = [(s, t) for s in symbols for t in timeframes]
+    if not os.getenv('DATABASE_URL'):
+        return {pair: _mock_data_or_raise(limit) for pair in pairs}
+
+    df = await _fetch_frame(
+        _BULK_TRAINING_QUERY,
+        {'symbols': list(symbols), 'timeframes': list(timeframes), 'limit': limit},
+        f"Bulk training data query for {len(pairs)} pairs"
+    )
+
+    frames = {}
+    for (symbol, timeframe), group in df.groupby(['_symbol', '_timeframe']):
+        frames[(symbol, timeframe)] = clean_training_frame(
+            group.drop(columns=['_symbol', '_timeframe', '_rn'])
+        )
+
+    missing = [pair for pair in pairs if pair not in frames]
+    if missing:
+        DB_QUERY_ERRORS.inc(len(missing), reason='empty')
+        logger.warning(f"No data found for {missing}")
+
+    logger.info(f"Fetched {len(df)} rows for {len(pairs)} symbol/timeframe pairs")
+    return frames
 
 
-def create_mock_data(limit=500):
+def create_mock_data(limit=500, schema=True):
     """
-    Create mock training data for testing
+    Create mock training data for testing.
+    schema=False keeps the float64 columns a raw query returns (parity checks).
     """
     import numpy as np
 
     logger.warning(f"Creating {limit} rows of mock data")
 
-    timestamps = range(limit)
     base_price = 2000
 
+    # One draw per column in the original order, so a given seed yields the
+    # same values as the former per-row list comprehensions
     mock_data = {
-        'timestamp': timestamps,
-        'open': [base_price + np.random.randn() * 50 for _ in range(limit)],
-        'high': [base_price + abs(np.random.randn()) * 60 for _ in range(limit)],
-        'low': [base_price - abs(np.random.randn()) * 60 for _ in range(limit)],
-        'close': [base_price + np.random.randn() * 50 for _ in range(limit)],
-        'volume': [1000 + abs(np.random.randn()) * 500 for _ in range(limit)],
-        'rsi': [50 + np.random.randn() * 20 for _ in range(limit)],
-        'macd': [np.random.randn() * 5 for _ in range(limit)],
-        'macd_signal': [np.random.randn() * 5 for _ in range(limit)],
-        'macd_histogram': [np.random.randn() * 3 for _ in range(limit)],
-        'ema9': [base_price + np.random.randn() * 30 for _ in range(limit)],
-        'ema21': [base_price + np.random.randn() * 40 for _ in range(limit)],
-        'ema50': [base_price + np.random.randn() * 50 for _ in range(limit)],
-        'ema200': [base_price + np.random.randn() * 70 for _ in range(limit)],
-        'vwap': [base_price + np.random.randn() * 30 for _ in range(limit)],
-        'atr': [30 + abs(np.random.randn()) * 10 for _ in range(limit)],
-        'bollinger_upper': [base_price + 50 + abs(np.random.randn()) * 20 for _ in range(limit)],
-        'bollinger_middle': [base_price + np.random.randn() * 30 for _ in range(limit)],
-        'bollinger_lower': [base_price - 50 - abs(np.random.randn()) * 20 for _ in range(limit)],
+        'timestamp': np.arange(limit, dtype=np.int64),
+        'open': base_price + np.random.randn(limit) * 50,
+        'high': base_price + np.abs(np.random.randn(limit)) * 60,
+        'low': base_price - np.abs(np.random.randn(limit)) * 60,
+        'close': base_price + np.random.randn(limit) * 50,
+        'volume': 1000 + np.abs(np.random.randn(limit)) * 500,
+        'rsi': 50 + np.random.randn(limit) * 20,
+        'macd': np.random.randn(limit) * 5,
+        'macd_signal': np.random.randn(limit) * 5,
+        'macd_histogram': np.random.randn(limit) * 3,
+        'ema9': base_price + np.random.randn(limit) * 30,
+        'ema21': base_price + np.random.randn(limit) * 40,
+        'ema50': base_price + np.random.randn(limit) * 50,
+        'ema200': base_price + np.random.randn(limit) * 70,
+        'vwap': base_price + np.random.randn(limit) * 30,
+        'atr': 30 + np.abs(np.random.randn(limit)) * 10,
+        'bollinger_upper': base_price + 50 + np.abs(np.random.randn(limit)) * 20,
+        'bollinger_middle': base_price + np.random.randn(limit) * 30,
+        'bollinger_lower': base_price - 50 - np.abs(np.random.randn(limit)) * 20,
     }
 
-    return pd.DataFrame(mock_data)
+    df = pd.DataFrame(mock_data)
+    return apply_schema(df) if schema else df
@@ -0,0 +1,58 @@
+"""
+Explicit dtypes for candle, indicator and feature data.
+
+Prices, indicators and engineered features are float32: XGBoost converts
+every input to float32 internally anyway, so holding them at that width
+halves memory and removes a full-matrix conversion per fit/predict
+without changing what the model sees. Timestamps are epoch milliseconds
+and stay int64 (float32 cannot represent them).
+"""
+import numpy as np
+
+FLOAT_DTYPE = np.float32
+TIMESTAMP_DTYPE = np.int64
+# Engineered feature matrices handed to the models
+FEATURE_DTYPE = np.float32
+
+OHLCV_SCHEMA = {
+    'timestamp': TIMESTAMP_DTYPE,
+    'open': FLOAT_DTYPE,
+    'high': FLOAT_DTYPE,
+    'low': FLOAT_DTYPE,
+    'close': FLOAT_DTYPE,
+    'volume': FLOAT_DTYPE,
+}
+
+INDICATOR_SCHEMA = {
+    'rsi': FLOAT_DTYPE,
+    'macd': FLOAT_DTYPE,
+    'macd_signal': FLOAT_DTYPE,
+    'macd_histogram': FLOAT_DTYPE,
+    'ema9': FLOAT_DTYPE,
+    'ema21': FLOAT_DTYPE,
+    'ema50': FLOAT_DTYPE,
+    'ema200': FLOAT_DTYPE,
+    'vwap': FLOAT_DTYPE,
+    'atr': FLOAT_DTYPE,
+    'adx': FLOAT_DTYPE,
+    'bb_width': FLOAT_DTYPE,
+    'bollinger_upper': FLOAT_DTYPE,
+    'bollinger_middle': FLOAT_DTYPE,
+    'bollinger_lower': FLOAT_DTYPE,
+}
+
+TRAINING_SCHEMA = {**OHLCV_SCHEMA, **INDICATOR_SCHEMA}
+
+
+def apply_schema(df, schema=TRAINING_SCHEMA):
+    """Cast the schema's columns present in df (others are left alone)."""
+    casts = {
+        column: dtype for column, dtype in schema.items()
+        if column in df.columns and df[column].dtype != dtype
+    }
+    return df.astype(casts, copy=False) if casts else df
+
+
+def as_features(X) -> np.ndarray:
+    """C-contiguous FEATURE_DTYPE view of X (no copy when it already is one)."""
+    return np.ascontiguousarray(X, dtype=FEATURE_DTYPE)
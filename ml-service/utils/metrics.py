@@ -0,0 +1,186 @@
+"""
+Minimal Prometheus-style metrics (counters + histograms) rendered in the
+text exposition format served by GET /metrics.
+
+Kept in-process and dependency-free; every update is a lock plus a few
+integer/float adds, so instrumenting hot paths costs microseconds.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds: 100µs .. 60s
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    body = ','.join(f'{k}="{v}"' for k, v in pairs)
+    return '{' + body + '}'
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._children = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _init_default_child(self):
+        # Unlabelled metrics are exported as 0 before their first update
+        if not self.label_names:
+            self._children[()] = self._new_child()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.label_names)
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type_name}',
+        ]
+        with self._lock:
+            children = sorted(self._children.items())
+            for key, value in children:
+                lines.extend(self._render_child(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._init_default_child()
+
+    def _new_child(self):
+        return 0.0
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._children.get(self._key(labels), 0.0)
+
+    def _render_child(self, key, value):
+        return [f'{self.name}_total{_format_labels(self.label_names, key)} {value}']
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._init_default_child()
+
+    def _new_child(self):
+        # [per-bucket counts..., +Inf count], sum
+        return [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            child[0][idx] += 1
+            child[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_child(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            labels = _format_labels(self.label_names, key, ('le', repr(float(bound))))
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        cumulative += counts[-1]
+        labels = _format_labels(self.label_names, key, ('le', '+Inf'))
+        lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        plain = _format_labels(self.label_names, key)
+        lines.append(f'{self.name}_sum{plain} {total}')
+        lines.append(f'{self.name}_count{plain} {cumulative}')
+        return lines
+
+
+def render_metrics() -> str:
+    """Render every registered metric in Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --- ML service metrics ---
+
+FEATURE_ENGINEERING_SECONDS = Histogram(
+    'ml_feature_engineering_seconds', 'Time spent engineering features', ['mode']
+)
+INFERENCE_SECONDS = Histogram(
+    'ml_inference_seconds', 'Time spent in price-direction model inference'
+)
+MODEL_LOAD_SECONDS = Histogram(
+    'ml_model_load_seconds', 'Time spent loading model artifacts from disk'
+)
+DB_FETCH_SECONDS = Histogram(
+    'ml_db_fetch_seconds', 'Time spent fetching training data from the database'
+)
+DB_QUERY_ERRORS = Counter(
+    'ml_db_query_errors', 'Training data queries that failed, by reason', ['reason']
+)
+SENTIMENT_SCORING_SECONDS = Histogram(
+    'ml_sentiment_scoring_seconds', 'Time spent scoring sentiment', ['mode']
+)
+FALLBACK_MODEL_PREDICTIONS = Counter(
+    'ml_fallback_model_predictions', 'Predictions served by the untrained fallback model'
+)
+KEYWORD_FALLBACK_PREDICTIONS = Counter(
+    'ml_sentiment_keyword_fallback', 'Sentiment texts scored by the keyword fallback'
+)
+TRAINING_RUNS = Counter(
+    'ml_training_runs', 'Price model training runs by the mode actually used', ['mode']
+)
+EXPLAIN_CACHE_LOOKUPS = Counter(
+    'ml_explain_cache_lookups', 'Explanation cache lookups by result', ['result']
+)
+SENTIMENT_CACHE_LOOKUPS = Counter(
+    'ml_sentiment_cache_lookups', 'Sentiment score cache lookups by result', ['result']
+)
+ADMISSION_REJECTIONS = Counter(
+    'ml_admission_rejections', 'Requests rejected by admission control', ['endpoint', 'reason']
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    'ml_admission_wait_seconds', 'Time admitted requests spent queued for a slot', ['priority']
+)
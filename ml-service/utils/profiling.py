@@ -0,0 +1,193 @@
+"""
+Opt-in request profiling for slow endpoints (/train, /sentiment/train).
+
+A profiled request records a cProfile trace plus per-stage wall/CPU timings
+from `profile_stage(...)` blocks placed in the service code. Results are
+written to PROFILE_PATH as <id>.prof (pstats, open with snakeviz/pstats)
+and <id>.json (stage timings + top functions) for later download.
+
+Blocking work handed to the threadpool is traced in its worker thread by
+`run_traced` and merged into the request's trace, so profiled work never
+has to run on the event loop.
+
+When no profile is active, `profile_stage` is a contextvar lookup and returns.
+"""
+import os
+import io
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PATH = os.getenv('PROFILE_PATH', './profiles')
+MAX_STORED_PROFILES = int(os.getenv('MAX_STORED_PROFILES', '20'))
+TOP_FUNCTIONS = 30
+
+_current = contextvars.ContextVar('profile_session', default=None)
+# cProfile can only trace one request at a time; concurrent profiled
+# requests still get stage timings but no function-level trace.
+_cprofile_lock = threading.Lock()
+
+
+class ProfileSession:
+
+    def __init__(self, name: str):
+        self.id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name}_{uuid.uuid4().hex[:6]}"
+        self.name = name
+        self.started_at = datetime.now().isoformat()
+        self.stages = []
+        self.profiler = None
+        # Traces of blocking calls recorded in worker threads (run_traced)
+        self.thread_profilers = []
+        self.wall_seconds = None
+        self.cpu_seconds = None
+
+    @contextmanager
+    def stage(self, name: str):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.stages.append({
+                'stage': name,
+                'wall_seconds': round(time.perf_counter() - wall_start, 6),
+                'cpu_seconds': round(time.process_time() - cpu_start, 6),
+            })
+
+    def summary(self) -> dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'stages': self.stages,
+            'cprofile': self.profiler is not None,
+            'top_functions': self._top_functions(),
+        }
+
+    def _stats(self, stream=None):
+        stats = pstats.Stats(self.profiler, stream=stream)
+        for profiler in self.thread_profilers:
+            stats.add(profiler)
+        return stats
+
+    def _top_functions(self) -> str:
+        if self.profiler is None:
+            return ''
+        out = io.StringIO()
+        self._stats(stream=out).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        return out.getvalue()
+
+    def save(self):
+        os.makedirs(PROFILE_PATH, exist_ok=True)
+        if self.profiler is not None:
+            self._stats().dump_stats(os.path.join(PROFILE_PATH, f'{self.id}.prof'))
+        with open(os.path.join(PROFILE_PATH, f'{self.id}.json'), 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        _prune()
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Time a pipeline stage if the current request is being profiled."""
+    session = _current.get()
+    if session is None:
+        yield
+        return
+    with session.stage(name):
+        yield
+
+
+def run_traced(func, *args, **kwargs):
+    """
+    Call func, adding a cProfile trace of the calling thread to the current
+    request's trace when one is recording. Meant to run inside a threadpool
+    worker (cProfile only sees the thread that enabled it).
+    """
+    session = _current.get()
+    if session is None or session.profiler is None:
+        return func(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler per interpreter
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        session.thread_profilers.append(profiler)
+
+
+@contextmanager
+def profile_request(name: str, enabled: bool):
+    """
+    Profile the enclosed block when enabled. Yields the ProfileSession
+    (or None when disabled); results are saved on exit, even on error.
+    """
+    if not enabled:
+        yield None
+        return
+
+    session = ProfileSession(name)
+    token = _current.set(session)
+    traced = _cprofile_lock.acquire(blocking=False)
+    if traced:
+        session.profiler = cProfile.Profile()
+        session.profiler.enable()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield session
+    finally:
+        session.wall_seconds = round(time.perf_counter() - wall_start, 6)
+        session.cpu_seconds = round(time.process_time() - cpu_start, 6)
+        if traced:
+            session.profiler.disable()
+            _cprofile_lock.release()
+        _current.reset(token)
+        try:
+            session.save()
+            logger.info(f"Profile saved: {session.id} ({session.wall_seconds:.3f}s)")
+        except Exception as e:
+            logger.error(f"Failed to save profile {session.id}: {e}")
+
+
+def _prune():
+    """Keep only the newest MAX_STORED_PROFILES profiles on disk."""
+    ids = list_profiles()
+    for old in ids[MAX_STORED_PROFILES:]:
+        for ext in ('.json', '.prof'):
+            path = os.path.join(PROFILE_PATH, old['id'] + ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_profiles() -> list:
+    """Stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_PATH):
+        return []
+    ids = sorted((f[:-5] for f in os.listdir(PROFILE_PATH) if f.endswith('.json')), reverse=True)
+    return [
+        {'id': pid, 'has_trace': os.path.exists(os.path.join(PROFILE_PATH, f'{pid}.prof'))}
+        for pid in ids
+    ]
+
+
+def profile_file(profile_id: str, ext: str):
+    """Path of a stored profile file, or None if missing / not a plain id."""
+    if os.path.basename(profile_id) != profile_id or profile_id.startswith('.'):
+        return None
+    path = os.path.join(PROFILE_PATH, f'{profile_id}{ext}')
+    return path if os.path.exists(path) else None